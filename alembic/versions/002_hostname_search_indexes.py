@@ -0,0 +1,36 @@
+"""Hostname search indexes - trigram and prefix
+
+Revision ID: 002_hostname_search_indexes
+Revises: 001_initial
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '002_hostname_search_indexes'
+down_revision: Union[str, None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Trigram index serves hostname_contains (ILIKE '%foo%')
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_servers_hostname_trgm
+        ON servers USING gin (hostname gin_trgm_ops);
+    """)
+
+    # Pattern-ops btree serves hostname_prefix (LIKE 'foo%') in any collation
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_servers_hostname_prefix
+        ON servers (hostname text_pattern_ops);
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_servers_hostname_prefix;")
+    op.execute("DROP INDEX IF EXISTS ix_servers_hostname_trgm;")
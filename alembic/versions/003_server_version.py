@@ -0,0 +1,42 @@
+"""Row version column for ETags and conditional writes
+
+Revision ID: 003_server_version
+Revises: 002_hostname_search_indexes
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '003_server_version'
+down_revision: Union[str, None] = '002_hostname_search_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE servers ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;")
+
+    # Bump the version on every UPDATE, whoever issues it
+    op.execute("""
+        CREATE OR REPLACE FUNCTION servers_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := OLD.version + 1;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("DROP TRIGGER IF EXISTS servers_bump_version ON servers;")
+    op.execute("""
+        CREATE TRIGGER servers_bump_version
+        BEFORE UPDATE ON servers
+        FOR EACH ROW EXECUTE FUNCTION servers_bump_version();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS servers_bump_version ON servers;")
+    op.execute("DROP FUNCTION IF EXISTS servers_bump_version();")
+    op.execute("ALTER TABLE servers DROP COLUMN IF EXISTS version;")
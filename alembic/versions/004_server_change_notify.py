@@ -0,0 +1,49 @@
+"""NOTIFY servers_changed on every write to servers
+
+Revision ID: 004_server_change_notify
+Revises: 003_server_version
+Create Date: 2024-03-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '004_server_change_notify'
+down_revision: Union[str, None] = '003_server_version'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Row changes carry the server id; TRUNCATE sends a null id
+    op.execute("""
+        CREATE OR REPLACE FUNCTION servers_notify_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('servers_changed', json_build_object(
+                'op', TG_OP,
+                'id', CASE TG_OP WHEN 'DELETE' THEN OLD.id WHEN 'TRUNCATE' THEN NULL ELSE NEW.id END
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("DROP TRIGGER IF EXISTS servers_notify_change ON servers;")
+    op.execute("""
+        CREATE TRIGGER servers_notify_change
+        AFTER INSERT OR UPDATE OR DELETE ON servers
+        FOR EACH ROW EXECUTE FUNCTION servers_notify_change();
+    """)
+    op.execute("DROP TRIGGER IF EXISTS servers_notify_truncate ON servers;")
+    op.execute("""
+        CREATE TRIGGER servers_notify_truncate
+        AFTER TRUNCATE ON servers
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_notify_change();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS servers_notify_truncate ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_notify_change ON servers;")
+    op.execute("DROP FUNCTION IF EXISTS servers_notify_change();")
@@ -0,0 +1,135 @@
+"""Fleet summary counters per state and subnet, maintained by triggers
+
+Revision ID: 005_server_stats
+Revises: 004_server_change_notify
+Create Date: 2024-03-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '005_server_stats'
+down_revision: Union[str, None] = '004_server_change_notify'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # /24 for IPv4 (/64 for IPv6); NULL for servers without an address
+    op.execute("""
+        CREATE OR REPLACE FUNCTION servers_subnet(ip inet) RETURNS cidr AS $$
+            SELECT network(set_masklen(ip, CASE family(ip) WHEN 4 THEN 24 ELSE 64 END))
+        $$ LANGUAGE sql IMMUTABLE STRICT;
+    """)
+    op.execute("""
+        CREATE TABLE server_state_counts (
+            state server_state PRIMARY KEY,
+            count BIGINT NOT NULL DEFAULT 0
+        );
+    """)
+    op.execute("""
+        CREATE TABLE server_subnet_counts (
+            state server_state NOT NULL,
+            subnet CIDR,
+            count BIGINT NOT NULL,
+            UNIQUE NULLS NOT DISTINCT (state, subnet)
+        );
+    """)
+    # Keeps the cleanup of emptied subnets cheap
+    op.execute("""
+        CREATE INDEX ix_server_subnet_counts_empty
+        ON server_subnet_counts (state) WHERE count = 0;
+    """)
+
+    # One statement-level trigger applies the net change of a whole
+    # statement, so a bulk write costs one upsert per (state, subnet)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION servers_count_changes() RETURNS trigger AS $$
+        DECLARE
+            changes text;
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM server_subnet_counts;
+                UPDATE server_state_counts SET count = 0;
+                RETURN NULL;
+            END IF;
+
+            changes := CASE TG_OP
+                WHEN 'INSERT' THEN 'SELECT state, ip_address, 1 AS n FROM new_rows'
+                WHEN 'DELETE' THEN 'SELECT state, ip_address, -1 AS n FROM old_rows'
+                ELSE 'SELECT state, ip_address, 1 AS n FROM new_rows
+                      UNION ALL SELECT state, ip_address, -1 FROM old_rows'
+            END;
+            EXECUTE format($sql$
+                WITH delta AS (
+                    SELECT state, servers_subnet(ip_address) AS subnet, sum(n) AS n
+                    FROM (%s) AS changes
+                    GROUP BY 1, 2
+                    HAVING sum(n) <> 0
+                ), by_state AS (
+                    INSERT INTO server_state_counts AS c (state, count)
+                    SELECT state, sum(n) FROM delta GROUP BY state
+                    ON CONFLICT (state) DO UPDATE SET count = c.count + EXCLUDED.count
+                )
+                INSERT INTO server_subnet_counts AS c (state, subnet, count)
+                SELECT state, subnet, n FROM delta
+                ON CONFLICT (state, subnet) DO UPDATE SET count = c.count + EXCLUDED.count
+            $sql$, changes);
+            DELETE FROM server_subnet_counts WHERE count = 0;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Nothing may write to servers between creating the triggers and the backfill
+    op.execute("LOCK TABLE servers IN SHARE ROW EXCLUSIVE MODE;")
+
+    # Transition tables allow one event per trigger
+    op.execute("""
+        CREATE TRIGGER servers_count_insert
+        AFTER INSERT ON servers REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_count_changes();
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_count_update
+        AFTER UPDATE ON servers REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_count_changes();
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_count_delete
+        AFTER DELETE ON servers REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_count_changes();
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_count_truncate
+        AFTER TRUNCATE ON servers
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_count_changes();
+    """)
+
+    # Backfill; every state gets a row, even when it has no servers yet
+    op.execute("""
+        INSERT INTO server_state_counts (state, count)
+        SELECT s.state, count(servers.id)
+        FROM unnest(enum_range(NULL::server_state)) AS s(state)
+        LEFT JOIN servers ON servers.state = s.state
+        GROUP BY s.state;
+    """)
+    op.execute("""
+        INSERT INTO server_subnet_counts (state, subnet, count)
+        SELECT state, servers_subnet(ip_address), count(*)
+        FROM servers
+        GROUP BY 1, 2;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS servers_count_truncate ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_count_delete ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_count_update ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_count_insert ON servers;")
+    op.execute("DROP FUNCTION IF EXISTS servers_count_changes();")
+    op.execute("DROP TABLE IF EXISTS server_subnet_counts;")
+    op.execute("DROP TABLE IF EXISTS server_state_counts;")
+    op.execute("DROP FUNCTION IF EXISTS servers_subnet(inet);")
@@ -0,0 +1,28 @@
+"""GiST inet_ops index on ip_address for subnet, range and exact lookups
+
+Revision ID: 006_ip_address_gist_index
+Revises: 005_server_stats
+Create Date: 2024-04-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '006_ip_address_gist_index'
+down_revision: Union[str, None] = '005_server_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves subnet (<<=), ip_from/ip_to (>=, <=) and exact (=) address filters
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_servers_ip_address_gist
+        ON servers USING gist (ip_address inet_ops);
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_servers_ip_address_gist;")
@@ -0,0 +1,86 @@
+"""Change log of server writes for GET /servers/changes
+
+Revision ID: 007_server_changes
+Revises: 006_ip_address_gist_index
+Create Date: 2024-04-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '007_server_changes'
+down_revision: Union[str, None] = '006_ip_address_gist_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per written server (server_id NULL for TRUNCATE). Readers page
+    # by (tx, seq) and only up to the oldest running transaction, so a row
+    # committed late can never land behind a watermark already handed out
+    op.execute("""
+        CREATE TABLE server_changes (
+            tx XID8 NOT NULL DEFAULT pg_current_xact_id(),
+            seq BIGINT GENERATED ALWAYS AS IDENTITY,
+            server_id INTEGER,
+            changed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (tx, seq)
+        );
+    """)
+    op.execute("CREATE INDEX ix_server_changes_server_id ON server_changes (server_id);")
+    # Newest (tx, seq) removed by compaction; older watermarks get 410 Gone
+    op.execute("""
+        CREATE TABLE server_changes_horizon (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            tx XID8 NOT NULL,
+            seq BIGINT NOT NULL
+        );
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION servers_log_changes() RETURNS trigger AS $$
+        BEGIN
+            CASE TG_OP
+                WHEN 'INSERT', 'UPDATE' THEN
+                    INSERT INTO server_changes (server_id) SELECT id FROM new_rows ORDER BY id;
+                WHEN 'DELETE' THEN
+                    INSERT INTO server_changes (server_id) SELECT id FROM old_rows ORDER BY id;
+                ELSE
+                    INSERT INTO server_changes (server_id) VALUES (NULL);
+            END CASE;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_log_insert
+        AFTER INSERT ON servers REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_log_changes();
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_log_update
+        AFTER UPDATE ON servers REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_log_changes();
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_log_delete
+        AFTER DELETE ON servers REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_log_changes();
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_log_truncate
+        AFTER TRUNCATE ON servers
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_log_changes();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS servers_log_truncate ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_log_delete ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_log_update ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_log_insert ON servers;")
+    op.execute("DROP FUNCTION IF EXISTS servers_log_changes();")
+    op.execute("DROP TABLE IF EXISTS server_changes_horizon;")
+    op.execute("DROP TABLE IF EXISTS server_changes;")
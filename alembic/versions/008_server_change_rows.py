@@ -0,0 +1,64 @@
+"""Carry the written rows in servers_changed notifications
+
+Revision ID: 008_server_change_rows
+Revises: 007_server_changes
+Create Date: 2024-05-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '008_server_change_rows'
+down_revision: Union[str, None] = '007_server_changes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # "server" is the row after the write (null for DELETE), "old" the row
+    # before it (UPDATE and DELETE), so GET /servers/watch can filter
+    # without a query. Only the function changes; the triggers stay
+    op.execute("""
+        CREATE OR REPLACE FUNCTION servers_notify_change() RETURNS trigger AS $$
+        DECLARE
+            new_row json;
+            old_row json;
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                new_row := json_build_object(
+                    'id', NEW.id, 'hostname', NEW.hostname, 'ip_address', NEW.ip_address,
+                    'state', NEW.state, 'created_at', NEW.created_at
+                );
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                old_row := json_build_object(
+                    'id', OLD.id, 'hostname', OLD.hostname, 'ip_address', OLD.ip_address,
+                    'state', OLD.state, 'created_at', OLD.created_at
+                );
+            END IF;
+            PERFORM pg_notify('servers_changed', json_build_object(
+                'op', TG_OP,
+                'id', CASE TG_OP WHEN 'DELETE' THEN OLD.id WHEN 'TRUNCATE' THEN NULL ELSE NEW.id END,
+                'server', new_row,
+                'old', old_row
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION servers_notify_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('servers_changed', json_build_object(
+                'op', TG_OP,
+                'id', CASE TG_OP WHEN 'DELETE' THEN OLD.id WHEN 'TRUNCATE' THEN NULL ELSE NEW.id END
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
@@ -0,0 +1,77 @@
+"""Collection version of servers for conditional GET /servers
+
+Revision ID: 009_server_collection_version
+Revises: 008_server_change_rows
+Create Date: 2024-05-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '009_server_collection_version'
+down_revision: Union[str, None] = '008_server_change_rows'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row, bumped by every statement that changes servers. It feeds the
+    # ETag and Last-Modified of GET /servers
+    op.execute("""
+        CREATE TABLE server_collection_version (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL DEFAULT 1,
+            modified_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    op.execute("INSERT INTO server_collection_version DEFAULT VALUES;")
+
+    # Statements that matched no rows (e.g. a failed If-Match) leave it
+    # alone. modified_at never moves backwards, whatever the clocks say
+    op.execute("""
+        CREATE OR REPLACE FUNCTION servers_bump_collection_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM FROM old_rows LIMIT 1;
+            ELSIF TG_OP <> 'TRUNCATE' THEN
+                PERFORM FROM new_rows LIMIT 1;
+            END IF;
+            IF TG_OP = 'TRUNCATE' OR FOUND THEN
+                UPDATE server_collection_version
+                SET version = version + 1, modified_at = greatest(clock_timestamp(), modified_at);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_collection_insert
+        AFTER INSERT ON servers REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_bump_collection_version();
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_collection_update
+        AFTER UPDATE ON servers REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_bump_collection_version();
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_collection_delete
+        AFTER DELETE ON servers REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_bump_collection_version();
+    """)
+    op.execute("""
+        CREATE TRIGGER servers_collection_truncate
+        AFTER TRUNCATE ON servers
+        FOR EACH STATEMENT EXECUTE FUNCTION servers_bump_collection_version();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS servers_collection_truncate ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_collection_delete ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_collection_update ON servers;")
+    op.execute("DROP TRIGGER IF EXISTS servers_collection_insert ON servers;")
+    op.execute("DROP FUNCTION IF EXISTS servers_bump_collection_version();")
+    op.execute("DROP TABLE IF EXISTS server_collection_version;")
@@ -0,0 +1,100 @@
+"""In-process read-through cache for single server lookups."""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.config import settings
+from app.metrics import SERVER_CACHE_EVICTIONS, SERVER_CACHE_HITS, SERVER_CACHE_MISSES
+
+
+class CachedServer(NamedTuple):
+    row: Dict[str, Any]
+    etag: str
+    expires_at: float
+
+
+class ServerCache:
+    """Bounded LRU cache of server rows and their ETags, with a TTL.
+
+    Entries are evicted by writes in this worker and by ``servers_changed``
+    notifications for writes made anywhere else (see ``app.listener``). The
+    TTL only bounds staleness if a notification is ever missed.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # Off until the listener connects (handle_connection): without it,
+        # writes from other workers would go unseen until the TTL expires
+        self.enabled = False
+        self._entries: "OrderedDict[int, CachedServer]" = OrderedDict()
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, server_id: int) -> Optional[CachedServer]:
+        entry = self._entries.get(server_id) if self.enabled else None
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self._entries[server_id]
+            SERVER_CACHE_EVICTIONS.labels(reason="expired").inc()
+            entry = None
+        if entry is None:
+            SERVER_CACHE_MISSES.inc()
+            return None
+        self._entries.move_to_end(server_id)
+        SERVER_CACHE_HITS.inc()
+        return entry
+
+    def generation(self) -> int:
+        """Token to take before reading a row from the database."""
+        return self._generation
+
+    def put(self, server_id: int, row: Dict[str, Any], etag: str, generation: int) -> CachedServer:
+        """Cache a row read from the database.
+
+        The row is only stored if nothing was invalidated since
+        ``generation`` was taken, so a read that raced with a write can never
+        put the old version back into the cache.
+        """
+        entry = CachedServer(row, etag, time.monotonic() + self.ttl)
+        if not self.enabled or generation != self._generation:
+            return entry
+        self._entries[server_id] = entry
+        self._entries.move_to_end(server_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            SERVER_CACHE_EVICTIONS.labels(reason="capacity").inc()
+        return entry
+
+    def invalidate(self, server_id: int):
+        self._generation += 1
+        if self._entries.pop(server_id, None) is not None:
+            SERVER_CACHE_EVICTIONS.labels(reason="invalidated").inc()
+
+    def clear(self):
+        self._generation += 1
+        if self._entries:
+            SERVER_CACHE_EVICTIONS.labels(reason="invalidated").inc(len(self._entries))
+            self._entries.clear()
+
+    def handle_change(self, change: Dict[str, Any]):
+        """Apply a ``servers_changed`` notification."""
+        if change.get("op") == "INSERT":
+            return  # New ids are never cached, nothing to evict
+        if change.get("id") is None:
+            self.clear()
+        else:
+            self.invalidate(change["id"])
+
+    def handle_connection(self, connected: bool):
+        """Drop everything whenever the notification stream starts or stops.
+
+        Changes may have been missed while it was down, and entries cannot be
+        trusted without it, so caching is paused until it is back.
+        """
+        self.clear()
+        self.enabled = connected and self.max_size > 0
+
+
+server_cache = ServerCache(settings.SERVER_CACHE_SIZE, settings.SERVER_CACHE_TTL)
@@ -0,0 +1,129 @@
+"""Change log behind ``GET /servers/changes``: watermarks and compaction."""
+import asyncio
+import re
+from typing import Tuple
+
+import psycopg
+
+from app.config import settings
+from app.database import connection, execute
+from app.logging import get_logger
+
+logger = get_logger(__name__)
+
+_WATERMARK = re.compile(r"(\d+)-(\d+)")
+# Ranges of the xid8 and bigint columns a watermark is compared against
+_MAX_TX = 2**64 - 1
+_MAX_SEQ = 2**63 - 1
+
+# Any constant works; it only has to be the same in every worker
+COMPACT_LOCK_KEY = 0x5345_5256
+
+
+class InvalidWatermark(ValueError):
+    """Raised when a ``since`` watermark cannot be parsed."""
+
+
+def encode_watermark(tx: str | int, seq: int) -> str:
+    """Watermark for the change log position ``(tx, seq)``."""
+    return f"{tx}-{seq}"
+
+
+def decode_watermark(token: str) -> Tuple[str, int]:
+    """Decode a watermark into ``(tx, seq)``; ``tx`` stays text for the ``xid8`` cast."""
+    match = _WATERMARK.fullmatch(token)
+    if not match:
+        raise InvalidWatermark("Malformed watermark")
+    tx, seq = int(match.group(1)), int(match.group(2))
+    if tx > _MAX_TX or seq > _MAX_SEQ:
+        raise InvalidWatermark("Watermark out of range")
+    return str(tx), seq
+
+
+async def compact(conn: psycopg.AsyncConnection) -> Tuple[int, int]:
+    """Shrink the change log; returns ``(superseded, expired)`` rows removed.
+
+    Entries followed by a newer one for the same server are dropped: a
+    delta always carries the server's current state, so only the newest
+    entry matters to any reader. Entries older than
+    ``SERVER_CHANGES_RETENTION`` are dropped too, and the horizon moves up
+    so readers behind it get 410 and resync. Only positions below the
+    oldest running transaction are expired, because one still running may
+    commit entries behind them.
+    """
+    async with conn.transaction(), conn.cursor() as cur:
+        await cur.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked", (COMPACT_LOCK_KEY,))
+        if not (await cur.fetchone())["locked"]:
+            return 0, 0  # another worker is on it
+        await execute(
+            cur, "server_changes.compact",
+            """
+            DELETE FROM server_changes c
+            USING server_changes n
+            WHERE n.server_id = c.server_id AND (n.tx, n.seq) > (c.tx, c.seq)
+            """
+        )
+        superseded = cur.rowcount
+        await execute(
+            cur, "server_changes.expire",
+            """
+            WITH cutoff AS (
+                SELECT tx, seq FROM server_changes
+                WHERE changed_at < now() - make_interval(secs => %s)
+                  AND tx < pg_snapshot_xmin(pg_current_snapshot())
+                ORDER BY tx DESC, seq DESC
+                LIMIT 1
+            ), expired AS (
+                DELETE FROM server_changes c
+                USING cutoff
+                WHERE (c.tx, c.seq) <= (cutoff.tx, cutoff.seq)
+                RETURNING 1
+            ), horizon AS (
+                INSERT INTO server_changes_horizon (tx, seq)
+                SELECT tx, seq FROM cutoff
+                ON CONFLICT (id) DO UPDATE SET tx = EXCLUDED.tx, seq = EXCLUDED.seq
+            )
+            SELECT count(*) AS expired FROM expired
+            """,
+            (settings.SERVER_CHANGES_RETENTION,)
+        )
+        expired = (await cur.fetchone())["expired"]
+    return superseded, expired
+
+
+class ChangeLogCompactor:
+    """Run ``compact`` every ``SERVER_CHANGES_COMPACT_INTERVAL`` seconds.
+
+    Every worker runs one; an advisory lock lets only one of them compact
+    at a time.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None and settings.SERVER_CHANGES_COMPACT_INTERVAL > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.SERVER_CHANGES_COMPACT_INTERVAL)
+            try:
+                async with connection() as conn:
+                    superseded, expired = await compact(conn)
+                if superseded or expired:
+                    logger.info("change log compacted", superseded=superseded, expired=expired)
+            except psycopg.Error as e:
+                logger.warning("change log compaction failed", error=str(e))
+
+
+change_compactor = ChangeLogCompactor()
@@ -1,29 +1,170 @@
+import itertools
+import time
+from contextlib import AsyncExitStack
+from typing import Sequence
+
 import psycopg
 from psycopg.rows import dict_row
+from psycopg.types.numeric import Int8Dumper
+from psycopg.types.string import TextLoader
 from psycopg_pool import AsyncConnectionPool
 from contextlib import asynccontextmanager
+from fastapi import Request
+from opentelemetry.trace import SpanKind
 
 from app.config import settings
+from app.logging import get_logger
+from app.metrics import (
+    DB_POOL_ACQUIRE_WAIT,
+    DB_POOL_IDLE,
+    DB_POOL_IN_USE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_SIZE,
+    DB_POOL_WAITING,
+    DB_QUERY_LATENCY,
+    DB_READ_ROUTES,
+    on_scrape,
+)
+from app.middleware import reads_pinned
+from app.tracing import get_tracer
+
+tracer = get_tracer(__name__)
+logger = get_logger(__name__)
 
 # Connection pool - reuses connections for better performance
 pool: AsyncConnectionPool | None = None
 
-async def init_pool():
-    """Initialize the connection pool. Call on app startup."""
-    global pool
-    pool = AsyncConnectionPool(
-        conninfo=settings.DATABASE_URL,
-        min_size=2,
-        max_size=10,
-        kwargs={"row_factory": dict_row},
+# Read-replica pools, one per DATABASE_READ_URLS entry, used round-robin
+read_pools: list[AsyncConnectionPool] = []
+# Replica index -> monotonic time until which it is skipped after a failure
+_replica_down_until: dict[int, float] = {}
+_next_replica = itertools.count()
+
+# Read-only statements prepared on every new pooled connection, with sample
+# parameters that fix their types (see hot_statement)
+HOT_STATEMENTS: list[tuple[str, Sequence]] = []
+
+def hot_statement(query: str, sample_params: Sequence = ()) -> str:
+    """Register ``query`` to be prepared when a pooled connection opens.
+
+    The statement is executed once with ``sample_params``, so it must be
+    read-only. Returns ``query`` so it can be used inline.
+    """
+    HOT_STATEMENTS.append((query, sample_params))
+    return query
+
+def connection_kwargs() -> dict:
+    """Keyword arguments for every connection the app opens.
+
+    Connections run in autocommit mode: almost every request is a single
+    statement, which is atomic on its own, so it costs one round trip
+    instead of BEGIN, the statement and COMMIT/ROLLBACK. Paths that need
+    several statements to be atomic use ``conn.transaction()``, and the
+    ``conn.commit()`` calls left after single writes are no-ops.
+    """
+    return {
+        "autocommit": True,
+        "row_factory": dict_row,
+        "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+        "prepare_threshold": settings.DB_PREPARE_THRESHOLD,
+    }
+
+async def configure_connection(conn: psycopg.AsyncConnection):
+    """Pool ``configure`` callback, run once per new connection.
+
+    Python ints are sent as ``int8`` rather than the smallest type that
+    fits the value, so a statement keeps a single prepared plan no matter
+    which ids it is called with. ``inet`` values are loaded as plain
+    strings, which is what every response renders anyway, instead of
+    ``ipaddress`` objects. Hot statements are then prepared up front, all
+    in one pipelined round trip, instead of after ``prepare_threshold``
+    executions.
+    """
+    conn.adapters.register_dumper(int, Int8Dumper)
+    conn.adapters.register_loader("inet", TextLoader)
+    if conn.prepare_threshold is None or not HOT_STATEMENTS:
+        return
+    async with conn.pipeline(), conn.cursor() as cur:
+        for query, params in HOT_STATEMENTS:
+            await cur.execute(query, params, prepare=True)
+
+def read_urls() -> list[str]:
+    """Replica connection strings from ``DATABASE_READ_URLS``."""
+    return [url.strip() for url in settings.DATABASE_READ_URLS.split(",") if url.strip()]
+
+def pool_sizes() -> tuple[int, int]:
+    """Per-worker ``(min_size, max_size)`` of each connection pool.
+
+    ``DB_CONNECTION_BUDGET`` is split evenly between the ``WEB_CONCURRENCY``
+    workers, less the dedicated LISTEN connection each of them keeps, and
+    caps ``DB_POOL_MAX_SIZE``. Every pool gets at least one connection, even
+    if that overshoots a too-small budget (``app.serve`` refuses to start
+    more workers than the budget can serve).
+    """
+    workers = settings.WEB_CONCURRENCY or 1
+    max_size = min(settings.DB_POOL_MAX_SIZE, max(1, settings.DB_CONNECTION_BUDGET // workers - 1))
+    return min(settings.DB_POOL_MIN_SIZE, max_size), max_size
+
+def _new_pool(conninfo: str) -> AsyncConnectionPool:
+    min_size, max_size = pool_sizes()
+    return AsyncConnectionPool(
+        conninfo=conninfo,
+        min_size=min_size,
+        max_size=max_size,
+        max_idle=settings.DB_POOL_MAX_IDLE,
+        max_lifetime=settings.DB_POOL_MAX_LIFETIME,
+        timeout=settings.DB_POOL_TIMEOUT,
+        kwargs=connection_kwargs(),
+        configure=configure_connection,
+        open=False,
     )
+
+async def init_pool():
+    """Initialize the connection pools. Call on app startup.
+
+    Replica pools open in the background like the primary one, so a
+    replica that is down at startup only means reads fall back to the
+    primary until it comes up.
+    """
+    global pool, read_pools
+    pool = _new_pool(settings.DATABASE_URL)
     await pool.open()
+    refresh_pool_gauges()
+    read_pools = [_new_pool(url) for url in read_urls()]
+    for replica in read_pools:
+        await replica.open()
+    _replica_down_until.clear()
 
 async def close_pool():
-    """Close the connection pool. Call on app shutdown."""
-    global pool
+    """Close the connection pools. Call on app shutdown."""
+    global pool, read_pools
     if pool:
         await pool.close()
+        pool = None
+        refresh_pool_gauges()
+    for replica in read_pools:
+        await replica.close()
+    read_pools = []
+
+def refresh_pool_gauges():
+    """Set the pool gauges from the primary pool's current stats.
+
+    Called when a connection is returned and before every scrape. The
+    gauges are set explicitly rather than read by a callback at scrape time
+    so that, with several workers, each one's last values are in the shared
+    metrics files and ``/metrics`` reports their sum (see ``app.metrics``).
+    """
+    stats = pool.get_stats() if pool else {}
+    size, available = stats.get("pool_size", 0), stats.get("pool_available", 0)
+    DB_POOL_MAX_SIZE.set(stats.get("pool_max", 0))
+    DB_POOL_SIZE.set(size)
+    DB_POOL_IDLE.set(available)
+    DB_POOL_WAITING.set(stats.get("requests_waiting", 0))
+    DB_POOL_IN_USE.set(size - available)
+
+@on_scrape
+async def _refresh_pool_gauges():
+    refresh_pool_gauges()
 
 class Database:
     """Legacy class for backward compatibility."""
@@ -32,7 +173,8 @@ class Database:
 
     @asynccontextmanager
     async def get_connection(self):
-        conn = await psycopg.AsyncConnection.connect(self.conn_str, row_factory=dict_row)
+        conn = await psycopg.AsyncConnection.connect(self.conn_str, **connection_kwargs())
+        await configure_connection(conn)
         try:
             yield conn
         finally:
@@ -40,14 +182,108 @@ class Database:
 
 db = Database()
 
-async def get_db_connection():
-    """Dependency that provides a pooled database connection."""
+def pool_stats() -> dict | None:
+    """Current pool statistics, or None when the pool isn't initialized."""
+    return pool.get_stats() if pool else None
+
+@asynccontextmanager
+async def connection(timeout: float | None = None):
+    """Borrow a pooled database connection outside of a request dependency.
+
+    Used where the connection must outlive the endpoint function, e.g. in
+    the generator behind a streaming response. ``timeout`` overrides the
+    pool's default wait for a free connection.
+    """
     global pool
     if pool:
-        async with pool.connection() as conn:
-            yield conn
+        started = time.perf_counter()
+        try:
+            async with pool.connection(timeout=timeout) as conn:
+                DB_POOL_ACQUIRE_WAIT.observe(time.perf_counter() - started)
+                yield conn
+        finally:
+            refresh_pool_gauges()
     else:
         # Fallback for tests or when pool isn't initialized
         async with db.get_connection() as conn:
             yield conn
 
+async def get_db_connection():
+    """Dependency that provides a pooled database connection."""
+    async with connection() as conn:
+        yield conn
+
+def _replica_order() -> list[int]:
+    """Indexes of the replicas to try, round-robin, skipping failed ones."""
+    now = time.monotonic()
+    start = next(_next_replica)
+    count = len(read_pools)
+    order = ((start + offset) % count for offset in range(count))
+    return [index for index in order if _replica_down_until.get(index, 0) <= now]
+
+def _mark_replica_down(index: int, error: Exception):
+    _replica_down_until[index] = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+    logger.warning("read replica unavailable", replica=index, error=str(error),
+                   retry_in=settings.DB_REPLICA_RETRY_SECONDS)
+
+@asynccontextmanager
+async def read_connection(primary: bool = False):
+    """Borrow a connection for read-only queries, from a replica if possible.
+
+    Replicas are tried round-robin. One that cannot hand out a connection
+    within ``DB_READ_TIMEOUT`` (or fails a query) is skipped for
+    ``DB_REPLICA_RETRY_SECONDS``; when none is usable the primary is used.
+    ``primary=True`` goes straight to the primary, for clients that must
+    read their own writes.
+    """
+    async with AsyncExitStack() as stack:
+        conn, replica = None, None
+        for index in ([] if primary else _replica_order()):
+            try:
+                conn = await stack.enter_async_context(
+                    read_pools[index].connection(timeout=settings.DB_READ_TIMEOUT)
+                )
+            except psycopg.OperationalError as e:  # includes PoolTimeout
+                _mark_replica_down(index, e)
+                continue
+            replica = index
+            break
+        if conn is None:
+            conn = await stack.enter_async_context(connection())
+        DB_READ_ROUTES.labels(target="primary" if replica is None else "replica").inc()
+        try:
+            yield conn
+        except psycopg.OperationalError as e:
+            if replica is not None:
+                _mark_replica_down(replica, e)
+            raise
+
+async def get_read_db_connection(request: Request):
+    """Dependency for read-only endpoints (see ``read_connection``)."""
+    async with read_connection(primary=reads_pinned(request)) as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def instrument_query(name: str):
+    """Time a database call and trace it as a child span.
+
+    ``name`` is a logical query name such as ``servers.get``; it labels the
+    ``db_query_duration_seconds`` histogram and names the span, so both stay
+    low-cardinality regardless of the SQL text or parameters.
+    """
+    with tracer.start_as_current_span(
+        name,
+        kind=SpanKind.CLIENT,
+        attributes={"db.system": "postgresql", "db.operation.name": name},
+    ):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            DB_QUERY_LATENCY.labels(query=name).observe(time.perf_counter() - started)
+
+async def execute(cur, name: str, query, params=None):
+    """Run ``cur.execute`` under ``instrument_query(name)``."""
+    async with instrument_query(name):
+        await cur.execute(query, params)
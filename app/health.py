@@ -1,6 +1,12 @@
-from fastapi import APIRouter
+import asyncio
+import time
+from fastapi import APIRouter, Response, status
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional, Tuple
+
+from app.config import settings
+from app.database import connection, pool_stats
 
 router = APIRouter(tags=["health"])
 
@@ -8,10 +14,23 @@ class HealthResponse(BaseModel):
     status: str
     timestamp: datetime
 
+class PoolHealth(BaseModel):
+    size: int
+    max_size: int
+    idle: int
+    in_use: int
+    waiting: int
+    saturation: float
+
 class ReadyResponse(BaseModel):
     status: str
     database: str
     timestamp: datetime
+    pool: Optional[PoolHealth] = None
+
+# Last readiness result and when it was taken (monotonic clock)
+_last_check: Optional[Tuple[float, ReadyResponse]] = None
+_check_lock = asyncio.Lock()
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -21,21 +40,59 @@ async def health_check():
         timestamp=datetime.utcnow()
     )
 
-@router.get("/ready", response_model=ReadyResponse)
-async def readiness_check():
-    """Readiness probe - is the service ready to accept traffic?"""
-    from app.database import db
-    
-    try:
-        async with db.get_connection() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("SELECT 1")
-        db_status = "connected"
-    except Exception:
-        db_status = "disconnected"
-    
+def _pool_health() -> Optional[PoolHealth]:
+    stats = pool_stats()
+    if stats is None:
+        return None
+    in_use = stats["pool_size"] - stats["pool_available"]
+    return PoolHealth(
+        size=stats["pool_size"],
+        max_size=stats["pool_max"],
+        idle=stats["pool_available"],
+        in_use=in_use,
+        waiting=stats["requests_waiting"],
+        saturation=round(in_use / stats["pool_max"], 3),
+    )
+
+async def _check_readiness() -> ReadyResponse:
+    pool_health = _pool_health()
+    if pool_health and pool_health.waiting > settings.READINESS_MAX_WAITING:
+        # Requests are already queueing for connections: shed traffic and
+        # don't add a ping of our own to the queue
+        db_status = "saturated"
+    else:
+        try:
+            async with connection(timeout=settings.READINESS_TIMEOUT) as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute("SELECT 1")
+            db_status = "connected"
+        except Exception:
+            db_status = "disconnected"
+
     return ReadyResponse(
         status="ready" if db_status == "connected" else "not_ready",
         database=db_status,
-        timestamp=datetime.utcnow()
+        timestamp=datetime.utcnow(),
+        pool=pool_health,
     )
+
+@router.get("/ready", response_model=ReadyResponse)
+async def readiness_check(response: Response):
+    """Readiness probe - is the service ready to accept traffic?
+
+    Borrows a connection from the shared pool instead of opening a new one,
+    and caches the result for ``READINESS_CACHE_SECONDS`` so frequent probes
+    from many pods don't turn into database load. Returns 503 when the
+    database is unreachable or the pool is saturated.
+    """
+    global _last_check
+
+    async with _check_lock:
+        now = time.monotonic()
+        if _last_check is None or now - _last_check[0] >= settings.READINESS_CACHE_SECONDS:
+            _last_check = (now, await _check_readiness())
+        result = _last_check[1]
+
+    if result.status != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return result
@@ -0,0 +1,92 @@
+"""Shared LISTEN connection for server change notifications."""
+import asyncio
+import json
+from typing import Any, Callable, Dict, List
+
+import psycopg
+
+from app.config import settings
+from app.logging import get_logger
+
+logger = get_logger(__name__)
+
+CHANNEL = "servers_changed"
+
+ChangeHandler = Callable[[Dict[str, Any]], None]
+ConnectionHandler = Callable[[bool], None]
+
+
+class ChangeListener:
+    """Listen on the ``servers_changed`` channel and fan out notifications.
+
+    Each worker keeps one dedicated autocommit connection, outside the pool,
+    and calls every registered handler with the decoded payload (``op`` and
+    ``id``; ``id`` is null for TRUNCATE). Connection handlers are told
+    whenever the stream goes up or down, because notifications sent while
+    it was down are lost. Reconnects back off exponentially.
+    """
+
+    def __init__(self, conninfo: str, channel: str = CHANNEL):
+        self.conninfo = conninfo
+        self.channel = channel
+        self._handlers: List[ChangeHandler] = []
+        self._connection_handlers: List[ConnectionHandler] = []
+        self._task: asyncio.Task | None = None
+
+    def add_handler(self, handler: ChangeHandler, on_connection: ConnectionHandler | None = None):
+        self._handlers.append(handler)
+        if on_connection:
+            self._connection_handlers.append(on_connection)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._set_connected(False)
+
+    def _set_connected(self, connected: bool):
+        for handler in self._connection_handlers:
+            handler(connected)
+
+    def _dispatch(self, payload: str):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            logger.warning("invalid change notification", payload=payload)
+            return
+        for handler in self._handlers:
+            # One failing handler must not starve the others or drop the
+            # LISTEN connection
+            try:
+                handler(change)
+            except Exception:
+                logger.exception("change handler failed", handler=getattr(handler, "__qualname__", repr(handler)))
+
+    async def _run(self):
+        delay = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.channel}")
+                    self._set_connected(True)
+                    delay = 1.0
+                    async for notify in conn.notifies():
+                        self._dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("change listener disconnected", error=str(e), retry_in=delay)
+            self._set_connected(False)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+change_listener = ChangeListener(settings.DATABASE_URL)
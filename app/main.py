@@ -2,19 +2,35 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routers import router as servers_router
 from app.health import router as health_router
-from app.metrics import router as metrics_router
+from app.metrics import mark_process_dead, router as metrics_router
 from app.database import init_pool, close_pool
+from app.cache import server_cache
+from app.changes import change_compactor
+from app.listener import change_listener
 from app.logging import setup_logging
-from app.tracing import setup_tracing
-from app.middleware import RequestIDMiddleware
+from app.watch import watch_hub
+from app.tracing import setup_tracing, shutdown_tracing
+from app.middleware import ReadYourWritesMiddleware, RequestIDMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup and shutdown events."""
+    """Startup and shutdown events, run once in every worker process.
+
+    Importing this module only builds the app (safe to preload before
+    workers start); connections and background tasks are opened here.
+    """
     setup_logging(json_logs=False)  # Set to True in production
     await init_pool()
+    change_listener.add_handler(server_cache.handle_change, server_cache.handle_connection)
+    change_listener.add_handler(watch_hub.handle_change, watch_hub.handle_connection)
+    change_listener.start()
+    change_compactor.start()
     yield
+    await change_compactor.stop()
+    await change_listener.stop()
     await close_pool()
+    mark_process_dead()  # stop counting this worker's pool and watch gauges
+    shutdown_tracing()  # flush spans still buffered in this worker
 
 app = FastAPI(
     title="Server Inventory API",
@@ -24,6 +40,7 @@ app = FastAPI(
 )
 
 # Add middleware
+app.add_middleware(ReadYourWritesMiddleware)
 app.add_middleware(RequestIDMiddleware)
 
 # Setup observability
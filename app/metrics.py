@@ -1,8 +1,26 @@
-"""Prometheus metrics configuration."""
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+"""Prometheus metrics configuration.
+
+With several worker processes (``app.serve`` sets ``PROMETHEUS_MULTIPROC_DIR``)
+every worker writes its samples to files in that directory and ``/metrics``
+merges them, whichever worker answers the scrape: counters and histograms
+are summed, and each gauge's ``multiprocess_mode`` says how to combine it.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
 from fastapi import APIRouter, Response
 import time
 from functools import wraps
+from typing import Awaitable, Callable, List
 
 router = APIRouter(tags=["metrics"])
 
@@ -29,14 +47,122 @@ SERVERS_DELETED = Counter(
     "Total number of servers deleted"
 )
 
+# Fleet size per state, refreshed from the summary table on every scrape by
+# the worker answering it
+SERVERS_BY_STATE = Gauge(
+    "servers_by_state",
+    "Number of servers in each state",
+    ["state"],
+    multiprocess_mode="mostrecent"
+)
+
+SERVER_CACHE_HITS = Counter(
+    "server_cache_hits_total",
+    "Server lookups answered from the in-process cache"
+)
+
+SERVER_CACHE_MISSES = Counter(
+    "server_cache_misses_total",
+    "Server lookups that had to query the database"
+)
+
+SERVER_CACHE_EVICTIONS = Counter(
+    "server_cache_evictions_total",
+    "Entries removed from the in-process server cache",
+    ["reason"]
+)
+
+WATCH_SUBSCRIBERS = Gauge(
+    "watch_subscribers",
+    "Open GET /servers/watch streams",
+    multiprocess_mode="livesum"
+)
+
+WATCH_DROPPED = Counter(
+    "watch_dropped_total",
+    "Watch subscribers dropped because their queue was full"
+)
+
+# Connection pool state from pool.get_stats(), summed over live workers
+DB_POOL_MAX_SIZE = Gauge(
+    "db_pool_max_size",
+    "Maximum number of connections in the pool",
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Current number of connections in the pool",
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_IDLE = Gauge(
+    "db_pool_connections_idle",
+    "Connections in the pool ready to be used",
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Connections currently borrowed from the pool",
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_WAITING = Gauge(
+    "db_pool_requests_waiting",
+    "Requests queued waiting for a connection",
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_ACQUIRE_WAIT = Histogram(
+    "db_pool_acquire_wait_seconds",
+    "Time spent waiting to borrow a connection from the pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+DB_READ_ROUTES = Counter(
+    "db_read_connections_total",
+    "Connections borrowed for read-only endpoints, by where they were routed",
+    ["target"]
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database query latency in seconds, by logical query name",
+    ["query"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+# Async callbacks run before every scrape, e.g. to refresh gauges from the DB
+_scrape_hooks: List[Callable[[], Awaitable[None]]] = []
+
+def on_scrape(hook: Callable[[], Awaitable[None]]) -> Callable[[], Awaitable[None]]:
+    """Register ``hook`` to run before ``/metrics`` is rendered."""
+    _scrape_hooks.append(hook)
+    return hook
+
 @router.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint."""
+    for hook in _scrape_hooks:
+        await hook()
     return Response(
-        content=generate_latest(),
+        content=generate_latest(_registry()),
         media_type=CONTENT_TYPE_LATEST
     )
 
+def _registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the merged metrics. Call on shutdown."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
+
 def record_request(method: str, endpoint: str, status: int, duration: float):
     """Record metrics for a request."""
     REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=status).inc()
@@ -1,32 +1,125 @@
-"""Request ID middleware for request tracing."""
+"""Request ID and request metrics middleware."""
+import time
 import uuid
 from contextvars import ContextVar
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.metrics import record_request
 
 
 # Context variable to store request ID across async boundaries
 request_id_ctx: ContextVar[str] = ContextVar("request_id", default="")
 
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Set after a successful write; read endpoints then skip the replicas
+PRIMARY_PIN_COOKIE = "inventory_read_primary"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
 
 def get_request_id() -> str:
     """Get the current request ID from context."""
     return request_id_ctx.get()
 
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Middleware that adds X-Request-ID header to all requests/responses."""
-    
-    async def dispatch(self, request: Request, call_next):
+def route_template(scope: Scope) -> str:
+    """Return the path template of the route that handled the request.
+
+    Metrics are labelled with ``/servers/{server_id}`` rather than the raw
+    path so label cardinality stays bounded. The template is rebuilt from
+    the matched path parameters, which keeps the mount prefix (``/v1``)
+    that a route object shared between routers would not know about.
+    """
+    if "endpoint" not in scope:
+        return UNMATCHED_ROUTE
+    params = scope.get("path_params")
+    if not params:
+        return scope["path"]
+    names = {str(value): name for name, value in params.items()}
+    return "/".join(
+        f"{{{names[segment]}}}" if segment in names else segment
+        for segment in scope["path"].split("/")
+    )
+
+
+class RequestIDMiddleware:
+    """Pure ASGI middleware that adds X-Request-ID and records request metrics.
+
+    Unlike ``BaseHTTPMiddleware`` it does not run the app in a separate task
+    or wrap the response stream; it only decorates the
+    ``http.response.start`` message, so streaming responses pass straight
+    through.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         # Use existing X-Request-ID or generate new one
-        request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
-        
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None:
+            request_id = str(uuid.uuid4())
+        header = (b"x-request-id", request_id.encode("latin-1"))
+        status_code = 500
+
+        async def send_with_request_id(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
         # Store in context for logging
         token = request_id_ctx.set(request_id)
-        
+        started = time.perf_counter()
         try:
-            response = await call_next(request)
-            response.headers["X-Request-ID"] = request_id
-            return response
+            await self.app(scope, receive, send_with_request_id)
         finally:
             request_id_ctx.reset(token)
+            record_request(scope["method"], route_template(scope), status_code, time.perf_counter() - started)
+
+
+def reads_pinned(request: HTTPConnection) -> bool:
+    """Whether this client wrote recently and must read from the primary."""
+    return PRIMARY_PIN_COOKIE in request.cookies
+
+
+class ReadYourWritesMiddleware:
+    """Pin a client to the primary for a short while after it writes.
+
+    Successful writes get a cookie that expires after
+    ``READ_YOUR_WRITES_SECONDS``; while it is present ``read_connection``
+    skips the replicas, so a client always sees its own writes even if the
+    replicas lag. Does nothing when no replicas are configured.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not settings.DATABASE_READ_URLS:
+            await self.app(scope, receive, send)
+            return
+
+        cookie = (
+            f"{PRIMARY_PIN_COOKIE}=1; Max-Age={max(1, round(settings.READ_YOUR_WRITES_SECONDS))}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        )
+
+        async def send_with_pin(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message["headers"] = [*message.get("headers", ()), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
@@ -1,19 +1,34 @@
 from enum import Enum
 from datetime import datetime
-from ipaddress import IPv4Address
-from typing import Optional
-from pydantic import BaseModel, ConfigDict, Field
+from ipaddress import IPv4Address, IPv4Network
+from typing import Dict, List, Literal, Optional
+import re
+from pydantic import BaseModel, ConfigDict, Field, conint, field_validator, model_validator
 
 class ServerState(str, Enum):
     active = "active"
     offline = "offline"
     retired = "retired"
 
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+# Postgres text cannot hold NUL, and no valid hostname has control characters
+_CONTROL_CHARS = re.compile(r"[\x00-\x1f\x7f]")
+
+def _check_hostname(value: Optional[str]) -> Optional[str]:
+    if value is not None and _CONTROL_CHARS.search(value):
+        raise ValueError("hostname must not contain control characters")
+    return value
+
 class ServerBase(BaseModel):
     hostname: str = Field(..., min_length=1, max_length=255)
     ip_address: IPv4Address
     state: ServerState
 
+    _hostname = field_validator("hostname")(_check_hostname)
+
 class ServerCreate(ServerBase):
     pass
 
@@ -22,8 +37,78 @@ class ServerUpdate(BaseModel):
     ip_address: Optional[IPv4Address] = None
     state: Optional[ServerState] = None
 
+    _hostname = field_validator("hostname")(_check_hostname)
+
 class Server(ServerBase):
     id: int
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+class BulkCreatedItem(BaseModel):
+    index: int
+    id: int
+
+class BulkCreateResult(BaseModel):
+    created: List[BulkCreatedItem]
+    errors: List[BulkItemError]
+
+class ServerFilter(BaseModel):
+    state: Optional[ServerState] = None
+    hostname_contains: Optional[str] = Field(None, min_length=1)
+    hostname_prefix: Optional[str] = Field(None, min_length=1)
+    subnet: Optional[IPv4Network] = None
+    ip_from: Optional[IPv4Address] = None
+    ip_to: Optional[IPv4Address] = None
+
+# Range of the SERIAL id column; larger ids could never exist
+ServerId = conint(ge=1, le=2**31 - 1)
+
+class ServerSelection(BaseModel):
+    """Servers targeted by a bulk operation: explicit ids or a filter."""
+    ids: Optional[List[ServerId]] = Field(None, min_length=1)
+    filter: Optional[ServerFilter] = None
+    if_match: Optional[Dict[ServerId, str]] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Provide exactly one of 'ids' or 'filter'")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("'filter' needs at least one criterion")
+        if self.ids is not None and self.if_match and not set(self.if_match) <= set(self.ids):
+            raise ValueError("'if_match' may only reference selected ids")
+        return self
+
+class BulkUpdateRequest(ServerSelection):
+    state: ServerState
+
+class BulkWriteResult(BaseModel):
+    affected: List[int]
+    not_found: List[int]
+    precondition_failed: List[int]
+
+class SubnetStats(BaseModel):
+    subnet: Optional[str]
+    total: int
+    by_state: Dict[ServerState, int]
+
+class ServerStats(BaseModel):
+    total: int
+    by_state: Dict[ServerState, int]
+    by_subnet: Optional[List[SubnetStats]] = None
+
+class ServerChange(BaseModel):
+    """One delta: the server's current row, its deletion, or a full reset."""
+    op: Literal["upsert", "delete", "reset"]
+    id: Optional[int] = None
+    server: Optional[Server] = None
+
+class ServerChanges(BaseModel):
+    changes: List[ServerChange]
+    next: str
+    more: bool
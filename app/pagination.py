@@ -0,0 +1,84 @@
+"""Opaque cursor tokens for keyset pagination."""
+import base64
+import binascii
+import json
+from ipaddress import IPv4Address, IPv4Network
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.models import ServerState
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded."""
+
+
+# Filters a cursor may carry, with the parser of the matching query parameter
+CURSOR_FILTERS: Dict[str, Callable[[str], Any]] = {
+    "state": ServerState,
+    "hostname_contains": str,
+    "hostname_prefix": str,
+    "subnet": IPv4Network,
+    "ip_from": IPv4Address,
+    "ip_to": IPv4Address,
+}
+
+
+def _check_filters(filters: Dict[str, Any]) -> Dict[str, str]:
+    """Validate cursor filters like their query parameters; tokens can be forged."""
+    checked = {}
+    for key, value in filters.items():
+        parse = CURSOR_FILTERS.get(key)
+        if parse is None or not isinstance(value, str):
+            raise InvalidCursor("Malformed cursor")
+        try:
+            parsed = parse(value)
+        except ValueError:
+            raise InvalidCursor("Malformed cursor")
+        checked[key] = getattr(parsed, "value", str(parsed))
+    return checked
+
+
+def encode_cursor(last_id: int, filters: Dict[str, Any]) -> str:
+    """Encode the last seen id and the active filters into an opaque token.
+
+    Filters that are not set are left out so the token stays short.
+    """
+    payload = {"id": last_id}
+    active = {key: value for key, value in filters.items() if value is not None}
+    if active:
+        payload["f"] = active
+    raw = json.dumps(payload, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[int, Dict[str, Any]]:
+    """Decode a cursor token into ``(last_id, filters)``."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = payload["id"]
+        filters = payload.get("f", {})
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+
+    if type(last_id) is not int or not isinstance(filters, dict):
+        raise InvalidCursor("Malformed cursor")
+    return last_id, _check_filters(filters)
+
+
+def merge_cursor_filters(
+    cursor_filters: Dict[str, Any], query_filters: Dict[str, Optional[Any]]
+) -> Dict[str, Optional[Any]]:
+    """Combine filters stored in a cursor with the ones on the request.
+
+    Filters omitted from the request are taken from the cursor. A filter that
+    is given on the request but differs from the cursor is rejected, since the
+    cursor position is only meaningful for the query that produced it.
+    """
+    merged = {}
+    for key, value in query_filters.items():
+        stored = cursor_filters.get(key)
+        if value is not None and stored is not None and value != stored:
+            raise InvalidCursor(f"Cursor does not match filter '{key}'")
+        merged[key] = value if value is not None else stored
+    return merged
@@ -1,14 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Header, Request, Response
+from fastapi.responses import StreamingResponse
+import psycopg
 from psycopg import AsyncConnection
 from psycopg.errors import UniqueViolation
-from typing import List, Optional
+from psycopg.rows import tuple_row
+from pydantic import ValidationError
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from collections import OrderedDict
+from datetime import timezone
+from email.utils import format_datetime
+from ipaddress import IPv4Address, IPv4Network
+import json
 
-from app.database import get_db_connection
-from app.models import Server, ServerCreate, ServerUpdate
-from app.etag import generate_etag, etag_matches, etag_none_match
+from app.cache import server_cache
+from app.changes import InvalidWatermark, decode_watermark, encode_watermark
+from app.config import settings
+from app.database import (
+    connection,
+    execute,
+    get_db_connection,
+    get_read_db_connection,
+    hot_statement,
+    instrument_query,
+    read_connection,
+)
+from app.logging import get_logger
+from app.metrics import SERVERS_BY_STATE, on_scrape
+from app.middleware import reads_pinned
+from app.models import (
+    BulkCreatedItem,
+    BulkCreateResult,
+    BulkItemError,
+    BulkUpdateRequest,
+    BulkWriteResult,
+    ExportFormat,
+    Server,
+    ServerCreate,
+    ServerSelection,
+    ServerChanges,
+    ServerState,
+    ServerStats,
+    ServerUpdate,
+    SubnetStats,
+)
+from app.etag import collection_etag, etag_none_match, etag_version, version_etag
+from app.responses import RawJSONResponse, RowJSONResponse
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor, merge_cursor_filters
+from app.watch import watch_hub
 
 router = APIRouter(prefix="/servers", tags=["servers"])
 
+logger = get_logger(__name__)
+
 
 @router.post("/", response_model=Server, status_code=status.HTTP_201_CREATED)
 async def create_server(
@@ -18,11 +61,12 @@ async def create_server(
 ):
     try:
         async with conn.cursor() as cur:
-            await cur.execute(
+            await execute(
+                cur, "servers.create",
                 """
                 INSERT INTO servers (hostname, ip_address, state)
                 VALUES (%s, %s, %s)
-                RETURNING id, hostname, ip_address, state, created_at
+                RETURNING id, hostname, ip_address, state, created_at, version
                 """,
                 (server.hostname, str(server.ip_address), server.state.value)
             )
@@ -30,7 +74,7 @@ async def create_server(
             await conn.commit()
             
             # Add ETag header to response
-            etag = generate_etag(new_server)
+            etag = version_etag(new_server["version"])
             response.headers["ETag"] = f'"{etag}"'
             
             return new_server
@@ -39,33 +83,215 @@ async def create_server(
         raise HTTPException(status_code=400, detail="Server with this hostname already exists")
 
 
-@router.get("/", response_model=List[Server])
-async def list_servers(
-    limit: int = 100,
-    offset: int = 0,
-    state: Optional[str] = None,
-    hostname_contains: Optional[str] = None,
+def _validation_detail(error: ValidationError) -> str:
+    """Flatten a pydantic ValidationError into a one-line message."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+async def _iter_bulk_items(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield ``(index, item)`` pairs from a JSON array or NDJSON body.
+
+    NDJSON is parsed line by line as it arrives, so large uploads are never
+    held in memory as a whole. A line that is not valid JSON is yielded as a
+    ``ValueError`` so it can be reported against its index.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" not in content_type:
+        try:
+            items = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        for index, item in enumerate(items):
+            yield index, item
+        return
+
+    index = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError as e:
+                yield index, ValueError(f"Invalid JSON: {e}")
+            index += 1
+    if buffer.strip():
+        try:
+            yield index, json.loads(buffer)
+        except ValueError as e:
+            yield index, ValueError(f"Invalid JSON: {e}")
+
+
+_BULK_BODY_SCHEMA = {
+    "type": "array",
+    "items": {"$ref": "#/components/schemas/ServerCreate"},
+}
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkCreateResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": _BULK_BODY_SCHEMA},
+                "application/x-ndjson": {"schema": {"$ref": "#/components/schemas/ServerCreate"}},
+            },
+        }
+    },
+)
+async def bulk_create_servers(
+    request: Request,
     conn: AsyncConnection = Depends(get_db_connection)
 ):
-    """List servers with optional filtering.
-    
-    Args:
-        limit: Maximum number of results (default 100)
-        offset: Pagination offset (default 0)
-        state: Filter by server state (active, offline, retired)
-        hostname_contains: Filter servers whose hostname contains this string
+    """Create many servers in one transaction.
+
+    Accepts a JSON array or an NDJSON stream (``Content-Type:
+    application/x-ndjson``) of ``ServerCreate`` objects. Rows are streamed
+    into a temporary table with ``COPY`` and inserted with a single
+    ``INSERT ... ON CONFLICT DO NOTHING``, so invalid items and duplicate
+    hostnames are reported per item without aborting the rest of the batch.
+    """
+    errors = []
+    async with conn.transaction(), conn.cursor() as cur:
+        await execute(
+            cur, "servers.bulk_create.stage",
+            """
+            CREATE TEMP TABLE bulk_servers (
+                ord INTEGER NOT NULL,
+                hostname VARCHAR(255) NOT NULL,
+                ip_address INET,
+                state server_state NOT NULL
+            ) ON COMMIT DROP
+            """
+        )
+
+        staged = []
+        async with cur.copy("COPY bulk_servers (ord, hostname, ip_address, state) FROM STDIN") as copy:
+            async for index, item in _iter_bulk_items(request):
+                if isinstance(item, ValueError):
+                    errors.append(BulkItemError(index=index, detail=str(item)))
+                    continue
+                try:
+                    server = ServerCreate.model_validate(item)
+                except ValidationError as e:
+                    errors.append(BulkItemError(index=index, detail=_validation_detail(e)))
+                    continue
+                await copy.write_row((index, server.hostname, str(server.ip_address), server.state.value))
+                staged.append(index)
+
+        # The first occurrence of a hostname in the batch wins; later ones
+        # and hostnames that already exist are reported as duplicates.
+        await execute(
+            cur, "servers.bulk_create.insert",
+            """
+            WITH candidates AS (
+                SELECT DISTINCT ON (hostname) ord, hostname, ip_address, state
+                FROM bulk_servers
+                ORDER BY hostname, ord
+            ), inserted AS (
+                INSERT INTO servers (hostname, ip_address, state)
+                SELECT hostname, ip_address, state FROM candidates ORDER BY ord
+                ON CONFLICT (hostname) DO NOTHING
+                RETURNING id, hostname
+            )
+            SELECT c.ord, i.id
+            FROM candidates c
+            JOIN inserted i USING (hostname)
+            ORDER BY c.ord
+            """
+        )
+        created = [BulkCreatedItem(index=row["ord"], id=row["id"]) for row in await cur.fetchall()]
+
+    created_indexes = {item.index for item in created}
+    errors.extend(
+        BulkItemError(index=index, detail="Server with this hostname already exists")
+        for index in staged
+        if index not in created_indexes
+    )
+    errors.sort(key=lambda error: error.index)
+    return BulkCreateResult(created=created, errors=errors)
+
+
+def _like_escape(value: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filter_conditions(filters: dict) -> Tuple[List[str], list]:
+    """Translate server filters into SQL conditions and parameters.
+
+    Shared by the list, export and bulk endpoints so a filter means the same
+    thing everywhere.
     """
-    # Build dynamic WHERE clause
     conditions = []
     params = []
-    
-    if state:
+
+    if filters.get("state"):
         conditions.append("state = %s")
-        params.append(state)
-    
-    if hostname_contains:
+        params.append(getattr(filters["state"], "value", filters["state"]))
+
+    if filters.get("hostname_contains"):
         conditions.append("hostname ILIKE %s")
-        params.append(f"%{hostname_contains}%")
+        params.append(f"%{_like_escape(filters['hostname_contains'])}%")
+
+    if filters.get("hostname_prefix"):
+        conditions.append("hostname LIKE %s")
+        params.append(f"{_like_escape(filters['hostname_prefix'])}%")
+
+    # The inet conditions are served by the GiST inet_ops index (migration 006)
+    if filters.get("subnet"):
+        conditions.append("ip_address <<= %s::inet")
+        params.append(str(filters["subnet"]))
+
+    if filters.get("ip_from"):
+        conditions.append("ip_address >= %s::inet")
+        params.append(str(filters["ip_from"]))
+
+    if filters.get("ip_to"):
+        conditions.append("ip_address <= %s::inet")
+        params.append(str(filters["ip_to"]))
+
+    return conditions, params
+
+
+def _ip_filters(
+    subnet: Optional[IPv4Network], ip_from: Optional[IPv4Address], ip_to: Optional[IPv4Address]
+) -> dict:
+    """Address filters from query parameters, as strings so cursors can store them."""
+    return {
+        "subnet": str(subnet) if subnet else None,
+        "ip_from": str(ip_from) if ip_from else None,
+        "ip_to": str(ip_to) if ip_to else None,
+    }
+
+
+def build_list_query(
+    filters: dict,
+    limit: int,
+    offset: int = 0,
+    after_id: Optional[int] = None,
+) -> Tuple[str, list]:
+    """Build the SELECT used by ``list_servers``.
+
+    ``hostname_contains`` is served by the trigram GIN index and
+    ``hostname_prefix`` by the ``text_pattern_ops`` btree (see migration
+    002), so neither needs a sequential scan.
+    """
+    conditions, params = _filter_conditions(filters)
+
+    if after_id is not None:
+        conditions.append("id > %s")
+        params.append(after_id)
     
     where_clause = ""
     if conditions:
@@ -76,41 +302,492 @@ async def list_servers(
         FROM servers 
         {where_clause}
         ORDER BY id 
-        LIMIT %s OFFSET %s
+        LIMIT %s
     """
-    params.extend([limit, offset])
+    params.append(limit)
+
+    if after_id is None and offset:
+        query += " OFFSET %s"
+        params.append(offset)
+
+    return query, params
+
+
+# Timestamps as the orjson path writes them (see app.responses.dumps): UTC
+# with a "Z" suffix, and no fraction when the microseconds are zero. "%%" is
+# the modulo operator escaped for a query that also takes parameters
+JSON_TIMESTAMP = """to_char({column} AT TIME ZONE 'UTC', CASE
+    WHEN extract(microseconds FROM {column})::bigint %% 1000000 = 0 THEN 'YYYY-MM-DD"T"HH24:MI:SS"Z"'
+    ELSE 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"' END)"""
+
+
+def json_list_query(query: str) -> str:
+    """Wrap a list query so Postgres renders the page as one JSON array.
+
+    Also returns the row count and last id, which the cursor headers need.
+    """
+    return f"""
+        SELECT coalesce(json_agg(s ORDER BY s.id), '[]')::text AS body,
+               count(*) AS count, max(s.id) AS last_id
+        FROM (
+            SELECT id, hostname, ip_address, state, {JSON_TIMESTAMP.format(column="created_at")} AS created_at
+            FROM ({query}) AS page
+        ) AS s
+    """
+
+
+# Unfiltered first pages and cursor pages are the common list calls
+hot_statement(*build_list_query({}, 100))
+hot_statement(*build_list_query({}, 100, after_id=0))
+
+GET_SERVER_QUERY = hot_statement(
+    "SELECT id, hostname, ip_address, state, created_at, version FROM servers WHERE id = %s",
+    (0,)
+)
+
+
+COLLECTION_VERSION_QUERY = hot_statement("SELECT version, modified_at FROM server_collection_version")
+
+
+@router.get("/", response_model=List[Server])
+async def list_servers(
+    request: Request,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    state: Optional[ServerState] = None,
+    hostname_contains: Optional[str] = None,
+    hostname_prefix: Optional[str] = None,
+    subnet: Optional[IPv4Network] = None,
+    ip_from: Optional[IPv4Address] = None,
+    ip_to: Optional[IPv4Address] = None,
+    if_none_match: Optional[str] = Header(None),
+    conn: AsyncConnection = Depends(get_read_db_connection)
+):
+    """List servers with optional filtering.
     
+    Args:
+        limit: Maximum number of results (default 100)
+        offset: Pagination offset (default 0), ignored when a cursor is given
+        cursor: Opaque token from a previous page's ``X-Next-Cursor`` header
+        state: Filter by server state (active, offline, retired)
+        hostname_contains: Filter servers whose hostname contains this string
+        hostname_prefix: Filter servers whose hostname starts with this string
+        subnet: Filter servers whose address is inside this CIDR block
+        ip_from: Filter servers whose address is at least this one
+        ip_to: Filter servers whose address is at most this one
+
+    When a full page is returned, the ``Link`` (rel="next") and
+    ``X-Next-Cursor`` headers point at the next page. Cursor pages are
+    fetched with ``WHERE id > last_id`` so every page costs the same.
+
+    Rows are encoded with orjson as they come from SQL rather than being
+    re-validated into ``Server`` models; with ``LIST_JSON_FROM_DB`` the
+    JSON array is rendered by Postgres instead.
+
+    The ``ETag`` combines the collection version, which a trigger bumps
+    on every write to ``servers``, with the query parameters, and
+    ``Last-Modified`` is the time of that write. A matching
+    ``If-None-Match`` gets 304 after reading only the version row.
+    """
+    filters = {
+        "state": state,
+        "hostname_contains": hostname_contains,
+        "hostname_prefix": hostname_prefix,
+        **_ip_filters(subnet, ip_from, ip_to),
+    }
+    after_id = None
+    if cursor:
+        try:
+            after_id, cursor_filters = decode_cursor(cursor)
+            filters = merge_cursor_filters(cursor_filters, filters)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    query, params = build_list_query(filters, limit, offset, after_id)
+
+    async with conn.cursor() as cur:
+        # Read before the page: a write landing in between can only make the
+        # ETag older than the body (one extra 200 later), never a wrong 304
+        await execute(cur, "servers.collection_version", COLLECTION_VERSION_QUERY)
+        collection = await cur.fetchone()
+        etag = collection_etag(
+            collection["version"], request.query_params.multi_items(),
+            "db" if settings.LIST_JSON_FROM_DB else ""
+        )
+        headers = {
+            "ETag": f'"{etag}"',
+            "Last-Modified": format_datetime(collection["modified_at"].astimezone(timezone.utc), usegmt=True),
+        }
+        if etag_none_match(etag, if_none_match):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if settings.LIST_JSON_FROM_DB:
+            await execute(cur, "servers.list", json_list_query(query), params)
+            page = await cur.fetchone()
+            count, last_id = page["count"], page["last_id"]
+        else:
+            await execute(cur, "servers.list", query, params)
+            servers = await cur.fetchall()
+            count, last_id = len(servers), servers[-1]["id"] if servers else None
+
+    if count and count == limit:
+        next_cursor = encode_cursor(last_id, filters)
+        next_url = request.url.remove_query_params("offset").include_query_params(cursor=next_cursor)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{next_url}>; rel="next"'
+
+    if settings.LIST_JSON_FROM_DB:
+        return RawJSONResponse(page["body"], headers=headers)
+    return RowJSONResponse(servers, headers=headers)
+
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+async def _export_ndjson(select: str, params: list, primary: bool) -> AsyncIterator[bytes]:
+    """Stream rows as NDJSON from a server-side cursor.
+
+    Rows are rendered with ``row_to_json`` in Postgres and fetched in
+    batches, so memory use does not depend on the size of the table.
+    """
+    async with read_connection(primary) as conn, conn.transaction():
+        async with conn.cursor(name="servers_export", row_factory=tuple_row) as cur:
+            await execute(cur, "servers.export", f"SELECT row_to_json(s)::text FROM ({select}) AS s", params)
+            while True:
+                async with instrument_query("servers.export.fetch"):
+                    rows = await cur.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                yield ("\n".join(row[0] for row in rows) + "\n").encode()
+
+
+async def _export_csv(select: str, params: list, primary: bool) -> AsyncIterator[bytes]:
+    """Stream rows as CSV produced by ``COPY ... TO STDOUT``."""
+    async with read_connection(primary) as conn:
+        async with conn.cursor() as cur:
+            async with cur.copy(f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER)", params) as copy:
+                buffer = bytearray()
+                async for data in copy:
+                    buffer += data
+                    if len(buffer) >= EXPORT_CHUNK_BYTES:
+                        yield bytes(buffer)
+                        buffer.clear()
+                if buffer:
+                    yield bytes(buffer)
+
+
+@router.get("/export")
+async def export_servers(
+    request: Request,
+    format: ExportFormat = ExportFormat.ndjson,
+    state: Optional[ServerState] = None,
+    hostname_contains: Optional[str] = None,
+    hostname_prefix: Optional[str] = None,
+    subnet: Optional[IPv4Network] = None,
+    ip_from: Optional[IPv4Address] = None,
+    ip_to: Optional[IPv4Address] = None,
+):
+    """Stream the whole (filtered) inventory as NDJSON or CSV.
+
+    Unlike ``list_servers`` nothing is paged or materialised: rows flow
+    from Postgres to the client in chunks. The connection is borrowed for
+    the lifetime of the stream rather than through a dependency, because it
+    has to stay open after this function returns.
+    """
+    filters = {
+        "state": state,
+        "hostname_contains": hostname_contains,
+        "hostname_prefix": hostname_prefix,
+        **_ip_filters(subnet, ip_from, ip_to),
+    }
+    conditions, params = _filter_conditions(filters)
+    where_clause = ""
+    if conditions:
+        where_clause = "WHERE " + " AND ".join(conditions)
+    select = f"SELECT id, hostname, ip_address, state, created_at FROM servers {where_clause} ORDER BY id"
+
+    primary = reads_pinned(request)
+    if format == ExportFormat.csv:
+        stream, media_type = _export_csv(select, params, primary), "text/csv"
+    else:
+        stream, media_type = _export_ndjson(select, params, primary), "application/x-ndjson"
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="servers.{format.value}"'},
+    )
+
+
+STATE_COUNTS_QUERY = hot_statement("SELECT state, count FROM server_state_counts")
+
+
+@router.get("/stats", response_model=ServerStats)
+async def server_stats(
+    by_subnet: bool = False,
+    conn: AsyncConnection = Depends(get_read_db_connection)
+):
+    """Fleet totals per state and, with ``by_subnet=true``, per /24 subnet.
+
+    Served from summary tables that statement-level triggers keep up to
+    date (migration 005), so the cost does not grow with the fleet.
+    Servers without an IP address are counted under a ``null`` subnet.
+    """
+    async with conn.cursor() as cur:
+        await execute(cur, "servers.stats", STATE_COUNTS_QUERY)
+        by_state = {state: 0 for state in ServerState}
+        by_state.update({row["state"]: row["count"] for row in await cur.fetchall()})
+        stats = ServerStats(total=sum(by_state.values()), by_state=by_state)
+
+        if by_subnet:
+            await execute(
+                cur, "servers.stats.subnets",
+                "SELECT subnet, state, count FROM server_subnet_counts ORDER BY subnet NULLS LAST, state"
+            )
+            subnets = {}
+            for row in await cur.fetchall():
+                subnet = str(row["subnet"]) if row["subnet"] is not None else None
+                entry = subnets.setdefault(subnet, SubnetStats(
+                    subnet=subnet, total=0, by_state={state: 0 for state in ServerState}
+                ))
+                entry.by_state[row["state"]] = row["count"]
+                entry.total += row["count"]
+            stats.by_subnet = list(subnets.values())
+
+    return stats
+
+
+SERVERS_BY_IP_QUERY = hot_statement(
+    "SELECT id, hostname, ip_address, state, created_at FROM servers WHERE ip_address = %s::inet ORDER BY id",
+    ("0.0.0.0",)
+)
+
+
+@router.get("/by-ip/{ip}", response_model=List[Server])
+async def get_servers_by_ip(
+    ip: IPv4Address,
+    conn: AsyncConnection = Depends(get_read_db_connection)
+):
+    """Servers with exactly this IP address (an index lookup, for alerting).
+
+    Addresses are not unique, so this returns a list; 404 when none match.
+    """
     async with conn.cursor() as cur:
-        await cur.execute(query, params)
+        await execute(cur, "servers.by_ip", SERVERS_BY_IP_QUERY, (str(ip),))
         servers = await cur.fetchall()
-        return servers
+    if not servers:
+        raise HTTPException(status_code=404, detail="No server with this IP address")
+    return RowJSONResponse(servers)
+
+
+CHANGES_QUERY = """
+    SELECT snap.xmin::text AS xmin, snap.expired, c.tx::text AS tx, c.seq, c.server_id,
+           s.id, s.hostname, s.ip_address, s.state, s.created_at
+    FROM (
+        SELECT pg_snapshot_xmin(pg_current_snapshot()) AS xmin,
+               coalesce((SELECT (%(tx)s::xid8, %(seq)s::bigint) < (h.tx, h.seq)
+                         FROM server_changes_horizon h), false) AS expired
+    ) snap
+    LEFT JOIN LATERAL (
+        SELECT tx, seq, server_id FROM server_changes
+        WHERE (tx, seq) > (%(tx)s::xid8, %(seq)s::bigint) AND tx < snap.xmin
+        ORDER BY tx, seq
+        LIMIT %(limit)s
+    ) c ON NOT snap.expired
+    LEFT JOIN servers s ON s.id = c.server_id
+    ORDER BY c.tx, c.seq
+"""
+
+
+@router.get("/changes", response_model=ServerChanges)
+async def list_server_changes(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    conn: AsyncConnection = Depends(get_read_db_connection)
+):
+    """Servers written since the ``since`` watermark, for delta sync.
+
+    Without ``since`` only the current head watermark is returned: pull
+    the full inventory once, then poll with the returned ``next``. Each
+    change carries the server's current row (``upsert``) or its id
+    (``delete``); a server written several times appears once. A
+    ``reset`` means the table was truncated and the client must resync.
+
+    Changes are read only up to the oldest transaction still running, so
+    a write that commits late never lands behind a watermark already
+    handed out. ``more`` is true when the page was cut at ``limit``.
+    Watermarks older than the compaction horizon get 410 Gone.
+    """
+    if since is None:
+        async with conn.cursor() as cur:
+            await execute(cur, "servers.changes.head", "SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS xmin")
+            row = await cur.fetchone()
+        return ServerChanges(changes=[], next=encode_watermark(row["xmin"], 0), more=False)
+    try:
+        tx, seq = decode_watermark(since)
+    except InvalidWatermark as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with conn.cursor() as cur:
+        await execute(cur, "servers.changes", CHANGES_QUERY, {"tx": tx, "seq": seq, "limit": limit})
+        rows = await cur.fetchall()
+    if rows[0]["expired"]:
+        raise HTTPException(status_code=410, detail="Watermark is older than the change log; resync")
+
+    changes = OrderedDict()
+    position = (int(tx), seq)
+    entries = [row for row in rows if row["tx"] is not None]
+    for row in entries:
+        position = (int(row["tx"]), row["seq"])
+        server_id = row["server_id"]
+        if server_id is None:
+            changes.clear()
+            changes[None] = {"op": "reset", "id": None, "server": None}
+        elif row["id"] is not None:
+            changes[server_id] = {"op": "upsert", "id": server_id, "server": {
+                key: row[key] for key in ("id", "hostname", "ip_address", "state", "created_at")
+            }}
+        else:
+            changes[server_id] = {"op": "delete", "id": server_id, "server": None}
+        changes.move_to_end(server_id)
+
+    more = len(entries) == limit
+    if not more:
+        # Nothing left below xmin; later writes all come from newer transactions
+        position = max(position, (int(rows[0]["xmin"]), 0))
+    return RowJSONResponse({
+        "changes": list(changes.values()),
+        "next": encode_watermark(*position),
+        "more": more,
+    })
+
+
+@router.get("/watch")
+async def watch_servers(
+    state: Optional[ServerState] = None,
+    hostname_contains: Optional[str] = None,
+    hostname_prefix: Optional[str] = None,
+    subnet: Optional[IPv4Network] = None,
+    ip_from: Optional[IPv4Address] = None,
+    ip_to: Optional[IPv4Address] = None,
+    id: Optional[List[int]] = Query(None),
+):
+    """Stream server changes as Server-Sent Events.
+
+    Takes the filters of ``GET /servers`` plus repeatable ``id``. Events
+    are ``insert``, ``update`` and ``delete`` with the server row (after
+    the write; the deleted row for ``delete``); an update is sent when
+    the row matched the filters before or after it, so a server leaving
+    the filter is seen too. ``reset`` means changes may have been missed
+    and the client should resync (for example from ``/servers/changes``).
+    A subscriber that falls too far behind gets ``dropped`` and the
+    stream ends.
+
+    Uses no database connection: changes come from the worker's shared
+    LISTEN connection (``app.watch``).
+    """
+    if watch_hub.full():
+        raise HTTPException(status_code=503, detail="Too many watchers on this worker")
+    filters = {
+        "state": state,
+        "hostname_contains": hostname_contains,
+        "hostname_prefix": hostname_prefix,
+        **_ip_filters(subnet, ip_from, ip_to),
+    }
+    return StreamingResponse(
+        watch_hub.stream(filters, id, settings.WATCH_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@on_scrape
+async def refresh_fleet_gauges():
+    """Set ``servers_by_state`` from the summary table before each scrape."""
+    try:
+        async with connection(timeout=settings.READINESS_TIMEOUT) as conn:
+            async with conn.cursor() as cur:
+                await execute(cur, "servers.stats", STATE_COUNTS_QUERY)
+                rows = await cur.fetchall()
+    except psycopg.Error as e:
+        # Keep serving the other metrics; the gauges keep their last values
+        logger.warning("could not refresh fleet gauges", error=str(e))
+        return
+    for row in rows:
+        SERVERS_BY_STATE.labels(state=row["state"]).set(row["count"])
 
 
 @router.get("/{server_id}", response_model=Server)
 async def get_server(
+    request: Request,
     server_id: int,
-    response: Response,
-    conn: AsyncConnection = Depends(get_db_connection),
     if_none_match: Optional[str] = Header(None)
 ):
-    async with conn.cursor() as cur:
-        await cur.execute(
-            "SELECT id, hostname, ip_address, state, created_at FROM servers WHERE id = %s",
-            (server_id,)
-        )
-        server = await cur.fetchone()
+    """Get one server, served from the per-worker cache when possible.
+
+    A cache hit (including a 304 revalidation) never touches the pool, so
+    the connection is only borrowed on a miss. The row is encoded with
+    orjson without being re-validated into a ``Server``.
+
+    Cache misses read from the primary: a lagging replica could return the
+    row as it was before the write whose notification just evicted it, and
+    that stale row would then be cached. With the cache disabled, reads go
+    to the replicas like the other read endpoints.
+    """
+    cached = server_cache.get(server_id)
+    if cached is None:
+        generation = server_cache.generation()
+        use_primary = server_cache.enabled or reads_pinned(request)
+        async with read_connection(primary=use_primary) as conn:
+            async with conn.cursor() as cur:
+                await execute(cur, "servers.get", GET_SERVER_QUERY, (server_id,))
+                server = await cur.fetchone()
         if not server:
             raise HTTPException(status_code=404, detail="Server not found")
-        
-        # Generate ETag
-        etag = generate_etag(server)
-        response.headers["ETag"] = f'"{etag}"'
-        
-        # Check If-None-Match for conditional GET (304 Not Modified)
-        if etag_none_match(etag, if_none_match):
-            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": f'"{etag}"'})
-        
-        return server
+        # The version only feeds the ETag; the cached row is the response body
+        etag = version_etag(server.pop("version"))
+        cached = server_cache.put(server_id, server, etag, generation)
+
+    headers = {"ETag": f'"{cached.etag}"'}
+    
+    # Check If-None-Match for conditional GET (304 Not Modified)
+    if etag_none_match(cached.etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return RowJSONResponse(cached.row, headers=headers)
+
+
+def _precondition_clause(if_match: Optional[str]) -> Tuple[str, list]:
+    """SQL condition enforcing an If-Match header inside the write itself."""
+    if if_match is None or if_match.strip() == "*":
+        return "", []
+    return " AND version = %s", [etag_version(if_match)]
+
+
+def _conditional_write(write: str) -> str:
+    """Wrap a single-row write so one round trip tells 404 from 412.
+
+    ``found`` reports whether the row existed in the statement's snapshot;
+    the written row's columns are NULL when the write did not happen.
+    """
+    return f"""
+        WITH target AS (SELECT 1 FROM servers WHERE id = %s),
+        written AS ({write})
+        SELECT EXISTS (SELECT 1 FROM target) AS found, written.*
+        FROM (VALUES (1)) AS one
+        LEFT JOIN written ON true
+    """
+
+
+def _raise_unless_written(row: dict):
+    if row["id"] is None:
+        if not row["found"]:
+            raise HTTPException(status_code=404, detail="Server not found")
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has been modified. Refresh and retry."
+        )
 
 
 @router.put("/{server_id}", response_model=Server)
@@ -126,24 +803,6 @@ async def update_server(
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    # If If-Match is provided, verify the ETag before updating
-    if if_match:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                "SELECT id, hostname, ip_address, state, created_at FROM servers WHERE id = %s",
-                (server_id,)
-            )
-            current = await cur.fetchone()
-            if not current:
-                raise HTTPException(status_code=404, detail="Server not found")
-            
-            current_etag = generate_etag(current)
-            if not etag_matches(current_etag, if_match):
-                raise HTTPException(
-                    status_code=status.HTTP_412_PRECONDITION_FAILED,
-                    detail="Resource has been modified. Refresh and retry."
-                )
-
     set_clauses = []
     values = []
     for key, value in update_data.items():
@@ -154,26 +813,27 @@ async def update_server(
         
         set_clauses.append(f"{key} = %s")
         values.append(value)
-    
-    values.append(server_id)
-    
-    query = f"""
+
+    # If If-Match is provided, the version check is part of the UPDATE
+    precondition, precondition_values = _precondition_clause(if_match)
+    query = _conditional_write(f"""
         UPDATE servers
         SET {", ".join(set_clauses)}
-        WHERE id = %s
-        RETURNING id, hostname, ip_address, state, created_at
-    """
+        WHERE id = %s{precondition}
+        RETURNING id, hostname, ip_address, state, created_at, version
+    """)
+    values = [server_id, *values, server_id, *precondition_values]
 
     try:
         async with conn.cursor() as cur:
-            await cur.execute(query, values)
+            await execute(cur, "servers.update", query, values)
             updated_server = await cur.fetchone()
-            if not updated_server:
-                raise HTTPException(status_code=404, detail="Server not found")
+            _raise_unless_written(updated_server)
             await conn.commit()
+            server_cache.invalidate(server_id)
             
             # Add new ETag to response
-            etag = generate_etag(updated_server)
+            etag = version_etag(updated_server["version"])
             response.headers["ETag"] = f'"{etag}"'
             
             return updated_server
@@ -188,28 +848,111 @@ async def delete_server(
     conn: AsyncConnection = Depends(get_db_connection),
     if_match: Optional[str] = Header(None)
 ):
-    # If If-Match is provided, verify the ETag before deleting
-    if if_match:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                "SELECT id, hostname, ip_address, state, created_at FROM servers WHERE id = %s",
-                (server_id,)
-            )
-            current = await cur.fetchone()
-            if not current:
-                raise HTTPException(status_code=404, detail="Server not found")
-            
-            current_etag = generate_etag(current)
-            if not etag_matches(current_etag, if_match):
-                raise HTTPException(
-                    status_code=status.HTTP_412_PRECONDITION_FAILED,
-                    detail="Resource has been modified. Refresh and retry."
-                )
+    # If If-Match is provided, the version check is part of the DELETE
+    precondition, precondition_values = _precondition_clause(if_match)
+    query = _conditional_write(
+        f"DELETE FROM servers WHERE id = %s{precondition} RETURNING id"
+    )
 
     async with conn.cursor() as cur:
-        await cur.execute("DELETE FROM servers WHERE id = %s RETURNING id", (server_id,))
+        await execute(cur, "servers.delete", query, [server_id, server_id, *precondition_values])
         deleted = await cur.fetchone()
-        if not deleted:
-            raise HTTPException(status_code=404, detail="Server not found")
+        _raise_unless_written(deleted)
+        await conn.commit()
+        server_cache.invalidate(server_id)
+
+
+def _int_version(version: Optional[int]) -> Optional[int]:
+    """``version`` if it fits the INTEGER column, else None (never matches)."""
+    return version if version is not None and version <= 2**31 - 1 else None
+
+
+def _bulk_write(write: str, write_params: list, selection: ServerSelection) -> Tuple[str, list]:
+    """Build one statement applying ``write`` to every selected server.
+
+    Returns ``(id, written)`` rows. With ``if_match`` the expected versions
+    are checked inside the same statement; ids whose version moved on come
+    back with ``written = false``.
+    """
+    if selection.ids is not None:
+        conditions, params = ["id = ANY(%s::int[])"], [selection.ids]
+    else:
+        conditions, params = _filter_conditions(selection.filter.model_dump(exclude_none=True))
+    where = " AND ".join(conditions)
+
+    expected = {
+        server_id: _int_version(etag_version(etag))
+        for server_id, etag in (selection.if_match or {}).items()
+        if etag.strip() != "*"
+    }
+    if not expected:
+        return f"{write} WHERE {where} RETURNING id, true AS written", [*write_params, *params]
+
+    query = f"""
+        WITH expected (id, version) AS (
+            SELECT * FROM unnest(%s::int[], %s::int[])
+        ), checked AS (
+            SELECT id FROM servers WHERE {where} AND id IN (SELECT id FROM expected)
+        ), written AS (
+            {write}
+            WHERE {where}
+              AND (id NOT IN (SELECT id FROM expected)
+                   OR (id, version) IN (SELECT id, version FROM expected))
+            RETURNING id
+        )
+        SELECT id, true AS written FROM written
+        UNION ALL
+        SELECT id, false FROM checked WHERE id NOT IN (SELECT id FROM written)
+    """
+    return query, [list(expected), list(expected.values()), *params, *write_params, *params]
+
+
+def _bulk_result(selection: ServerSelection, rows: List[dict]) -> BulkWriteResult:
+    affected = sorted(row["id"] for row in rows if row["written"])
+    failed = sorted(row["id"] for row in rows if not row["written"])
+    not_found = []
+    if selection.ids is not None:
+        not_found = sorted(set(selection.ids) - set(affected) - set(failed))
+    return BulkWriteResult(affected=affected, not_found=not_found, precondition_failed=failed)
+
+
+@router.patch("/bulk", response_model=BulkWriteResult)
+async def bulk_update_servers(
+    body: BulkUpdateRequest,
+    conn: AsyncConnection = Depends(get_db_connection)
+):
+    """Set the state of many servers with one set-based UPDATE.
+
+    Servers are selected by ``ids`` or by ``filter``. ``if_match`` maps ids
+    to ETags; servers whose ETag is stale are skipped and reported in
+    ``precondition_failed`` instead of failing the whole batch.
+    """
+    query, params = _bulk_write("UPDATE servers SET state = %s", [body.state.value], body)
+    async with conn.cursor() as cur:
+        await execute(cur, "servers.bulk_update", query, params)
+        rows = await cur.fetchall()
         await conn.commit()
+    for row in rows:
+        if row["written"]:
+            server_cache.invalidate(row["id"])
+    return _bulk_result(body, rows)
+
 
+@router.post("/bulk-delete", response_model=BulkWriteResult)
+async def bulk_delete_servers(
+    body: ServerSelection,
+    conn: AsyncConnection = Depends(get_db_connection)
+):
+    """Delete many servers with one set-based DELETE.
+
+    Takes the same selection and ``if_match`` rules as ``PATCH /servers/bulk``.
+    """
+    query, params = _bulk_write("DELETE FROM servers", [], body)
+    async with conn.cursor() as cur:
+        await execute(cur, "servers.bulk_delete", query, params)
+        rows = await cur.fetchall()
+        await conn.commit()
+    for row in rows:
+        if row["written"]:
+            server_cache.invalidate(row["id"])
+    return _bulk_result(body, rows)
@@ -0,0 +1,128 @@
+"""Production entry point: the API in several uvicorn worker processes.
+
+    python -m app.serve --workers 4 --port 8000
+
+The supervisor binds the listening socket once and every worker accepts on
+that shared socket, so the kernel spreads connections across workers.
+Workers run on uvloop with the httptools HTTP parser, restart if they die,
+and on SIGINT/SIGTERM stop accepting, finish in-flight requests for up to
+``SHUTDOWN_TIMEOUT`` seconds and close their pools via the app's lifespan.
+With more than one worker, Prometheus metrics are collected in
+``PROMETHEUS_MULTIPROC_DIR`` (a fresh temporary directory unless set) so
+``/metrics`` reports the whole server, not the worker that answered.
+"""
+import argparse
+import glob
+import math
+import os
+import tempfile
+
+import uvicorn
+
+from app.config import settings
+
+APP = "app.main:app"
+
+
+def cpu_quota() -> int | None:
+    """CPUs granted by the cgroup CPU quota (rounded up), None if unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:  # cgroup v2
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        try:  # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = f.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    try:
+        return max(1, math.ceil(int(quota) / int(period)))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def max_workers() -> int:
+    """Most workers ``DB_CONNECTION_BUDGET`` can serve.
+
+    Each worker needs its LISTEN connection plus ``DB_POOL_MIN_SIZE``
+    pooled connections.
+    """
+    return max(1, settings.DB_CONNECTION_BUDGET // (settings.DB_POOL_MIN_SIZE + 1))
+
+
+def default_workers() -> int:
+    """CPUs this process may use, capped by ``max_workers``.
+
+    Respects both CPU affinity and the container's cgroup CPU quota, which
+    affinity alone does not reflect.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota = cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, quota)
+    return min(cpus, max_workers())
+
+
+def multiprocess_metrics_dir() -> str:
+    """Empty directory for the workers' Prometheus metric files.
+
+    Samples left by a previous run would be merged into this one's, so an
+    existing ``PROMETHEUS_MULTIPROC_DIR`` is cleared.
+    """
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        return tempfile.mkdtemp(prefix="inventory-metrics-")
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+    return path
+
+
+def uvicorn_options(workers: int, host: str, port: int) -> dict:
+    return {
+        "host": host,
+        "port": port,
+        "workers": workers,
+        "loop": "uvloop",
+        "http": "httptools",
+        "timeout_graceful_shutdown": settings.SHUTDOWN_TIMEOUT,
+        "proxy_headers": True,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY or default_workers())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    if not 1 <= args.workers <= max_workers():
+        parser.error(
+            f"--workers must be between 1 and {max_workers()} with "
+            f"DB_CONNECTION_BUDGET={settings.DB_CONNECTION_BUDGET} and "
+            f"DB_POOL_MIN_SIZE={settings.DB_POOL_MIN_SIZE}"
+        )
+
+    # Workers are spawned processes that read settings from the environment;
+    # they size their pools from the budget by the number of workers
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    if args.workers > 1:
+        # Must be set before prometheus_client is imported (by the preload)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = multiprocess_metrics_dir()
+
+    # Preload: import the app once in the supervisor so a broken import or
+    # invalid setting fails here instead of crash-looping every worker
+    import app.main  # noqa: F401
+
+    uvicorn.run(APP, **uvicorn_options(args.workers, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Fan-out of ``servers_changed`` notifications to ``GET /servers/watch``."""
+import asyncio
+import re
+from datetime import datetime
+from ipaddress import ip_address, ip_network
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.logging import get_logger
+from app.metrics import WATCH_DROPPED, WATCH_SUBSCRIBERS
+from app.responses import dumps
+
+logger = get_logger(__name__)
+
+Matcher = Callable[[Dict[str, Any]], bool]
+
+# Sent as an SSE comment so idle proxies keep the stream open
+HEARTBEAT = b": keep-alive\n\n"
+
+
+def event(name: str, data: Any = None) -> bytes:
+    """One Server-Sent Events frame."""
+    return b"event: " + name.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+RESET = event("reset")
+DROPPED = event("dropped")
+
+# Postgres drops trailing zeros from the fraction ("...:00.12345+00:00"),
+# which datetime.fromisoformat only accepts from Python 3.11
+_FRACTION = re.compile(r"(?<=:\d\d)\.(\d+)")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a timestamp from Postgres JSON on any supported Python."""
+    return datetime.fromisoformat(_FRACTION.sub(lambda m: "." + m.group(1).ljust(6, "0")[:6], value, count=1))
+
+
+def filter_key(filters: dict, ids: Optional[Iterable[int]] = None) -> Hashable:
+    """Identity of a filter, so subscribers sharing one are matched once."""
+    values = tuple(sorted((name, str(getattr(value, "value", value))) for name, value in filters.items() if value))
+    return values, tuple(sorted(set(ids))) if ids else None
+
+
+def server_matcher(filters: dict, ids: Optional[Iterable[int]] = None) -> Matcher:
+    """Python twin of ``routers._filter_conditions`` for a notified row.
+
+    Filters have the same meaning as on ``GET /servers``: a server without
+    an IP address never matches an address filter, as with SQL NULLs.
+    """
+    ids = set(ids) if ids else None
+    state = getattr(filters.get("state"), "value", filters.get("state"))
+    contains = (filters.get("hostname_contains") or "").lower()
+    prefix = filters.get("hostname_prefix")
+    subnet = ip_network(filters["subnet"]) if filters.get("subnet") else None
+    ip_from = ip_address(filters["ip_from"]) if filters.get("ip_from") else None
+    ip_to = ip_address(filters["ip_to"]) if filters.get("ip_to") else None
+
+    def matches(server: Dict[str, Any]) -> bool:
+        if ids is not None and server["id"] not in ids:
+            return False
+        if state and server["state"] != state:
+            return False
+        if contains and contains not in server["hostname"].lower():
+            return False
+        if prefix and not server["hostname"].startswith(prefix):
+            return False
+        if subnet or ip_from or ip_to:
+            address = server["_address"]
+            if address is None or address.version != 4:
+                return False
+            if subnet and address not in subnet:
+                return False
+            if ip_from and address < ip_from:
+                return False
+            if ip_to and address > ip_to:
+                return False
+        return True
+
+    return matches
+
+
+def _public(server: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in server.items() if key != "_address"}
+
+
+class Subscriber:
+    """One watch stream: its filter and a bounded queue of encoded frames."""
+
+    __slots__ = ("key", "queue")
+
+    def __init__(self, key: Hashable, queue_size: int):
+        self.key = key
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+
+
+class WatchHub:
+    """Route notifications from ``app.listener`` to watch subscribers.
+
+    Watchers hold no database connection: every change arrives once per
+    worker on the listener's connection, is encoded once, and its frame is
+    queued for each subscriber whose filter matches the new or the old row.
+    Subscribers are grouped by filter, so each distinct filter is evaluated
+    once per change however many streams share it.
+    A subscriber whose queue is full is dropped instead of slowing down the
+    others or buffering without bound. After the listener reconnects, every
+    subscriber gets a ``reset`` because changes may have been missed.
+    """
+
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._groups: Dict[Hashable, Tuple[Matcher, Set[Subscriber]]] = {}
+        self._count = 0
+        self._connected_before = False
+
+    def __len__(self) -> int:
+        return self._count
+
+    def full(self) -> bool:
+        return self._count >= self.max_subscribers
+
+    def subscribe(self, filters: dict, ids: Optional[Iterable[int]] = None) -> Subscriber:
+        key = filter_key(filters, ids)
+        if key not in self._groups:
+            self._groups[key] = (server_matcher(filters, ids), set())
+        subscriber = Subscriber(key, self.queue_size)
+        self._groups[key][1].add(subscriber)
+        self._count += 1
+        WATCH_SUBSCRIBERS.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        group = self._groups.get(subscriber.key)
+        if group is None or subscriber not in group[1]:
+            return
+        group[1].remove(subscriber)
+        if not group[1]:
+            del self._groups[subscriber.key]
+        self._count -= 1
+        WATCH_SUBSCRIBERS.dec()
+
+    def handle_change(self, change: Dict[str, Any]):
+        """Apply a ``servers_changed`` notification."""
+        if not self._groups:
+            return
+        if change.get("id") is None:
+            self._broadcast(RESET)  # TRUNCATE
+            return
+        new, old = change.get("server"), change.get("old")
+        if new is None and old is None:
+            return  # sent by a schema older than migration 008
+        rows = [self._load(row) for row in (new, old) if row is not None]
+        frame = event(change["op"].lower(), _public(rows[0]))
+        for matches, subscribers in list(self._groups.values()):
+            if any(matches(row) for row in rows):
+                for subscriber in list(subscribers):
+                    self._publish(subscriber, frame)
+
+    def handle_connection(self, connected: bool):
+        if connected and self._connected_before:
+            self._broadcast(RESET)
+        self._connected_before = self._connected_before or connected
+
+    @staticmethod
+    def _load(row: Dict[str, Any]) -> Dict[str, Any]:
+        # Postgres JSON carries timestamps as ISO strings; parse them so the
+        # frame is encoded like every other response
+        server = dict(row)
+        if server.get("created_at"):
+            server["created_at"] = parse_timestamp(server["created_at"])
+        server["_address"] = ip_address(server["ip_address"]) if server.get("ip_address") else None
+        return server
+
+    def _subscribers(self) -> List[Subscriber]:
+        return [subscriber for _, subscribers in self._groups.values() for subscriber in subscribers]
+
+    def _broadcast(self, frame: bytes):
+        for subscriber in self._subscribers():
+            self._publish(subscriber, frame)
+
+    def _publish(self, subscriber: Subscriber, frame: bytes):
+        try:
+            subscriber.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too slow: replace the backlog with a final frame and let the
+            # stream close itself
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(DROPPED)
+            self.unsubscribe(subscriber)
+            WATCH_DROPPED.inc()
+            logger.info("dropped slow watch subscriber", queue_size=self.queue_size)
+
+    async def stream(self, filters: dict, ids: Optional[Iterable[int]], heartbeat: float):
+        """Subscribe and yield SSE frames until the subscriber is dropped.
+
+        Subscribing inside the generator ties the subscription to the
+        response body, so it ends however the stream does.
+        """
+        subscriber = self.subscribe(filters, ids)
+        try:
+            yield b": watching\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    frame = HEARTBEAT
+                yield frame
+                if frame is DROPPED:
+                    return
+        finally:
+            self.unsubscribe(subscriber)
+
+
+watch_hub = WatchHub(settings.WATCH_QUEUE_SIZE, settings.WATCH_MAX_SUBSCRIBERS)
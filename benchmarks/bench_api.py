@@ -0,0 +1,354 @@
+"""API benchmark suite: latency percentiles and throughput for every endpoint.
+
+Seeds the database with a fleet of ``--fleet-size`` servers (``10k``,
+``100k``, ``1m`` or any number) and drives each ``/servers`` endpoint in
+turn with ``--concurrency`` async clients for ``--seconds``, reporting
+requests/sec and p50/p95/p99 latency per scenario.
+
+The fleet is deterministic (``bench-api-0000000`` ... with fixed addresses
+and states) and loaded with ``COPY``. It is kept between runs and only
+rebuilt when its size changes, so repeated runs compare like with like;
+``--drop-fleet`` removes it afterwards. Rows created by the write scenarios
+are always removed.
+
+By default the app runs in-process (``httpx`` + ``ASGITransport``, full
+lifespan, no sockets). ``--url`` targets a running server instead, e.g.
+``python -m app.serve``, to include the HTTP stack and several workers.
+
+Results can be saved as JSON and compared with an earlier run; the
+comparison fails (exit 1) when any scenario's throughput drops, or its p95
+latency grows, by more than ``--max-regression`` percent:
+
+    python -m benchmarks.bench_api --fleet-size 100k --output base.json
+    python -m benchmarks.bench_api --fleet-size 100k --baseline base.json
+
+``make bench`` runs the default 10k fleet and saves ``bench-results.json``.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app import database
+from app.pagination import encode_cursor
+
+PREFIX = "bench-api-"
+NEW_PREFIX = PREFIX + "new-"
+STATES = ["active"] * 16 + ["offline"] * 3 + ["retired"]
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+Scenario = Callable[[httpx.AsyncClient, random.Random], Awaitable[Optional[httpx.Response]]]
+
+
+def fleet_size(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
+
+
+def fleet_ip(n: int) -> str:
+    return f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+def fleet_row(n: int) -> tuple:
+    return f"{PREFIX}{n:07d}", fleet_ip(n), STATES[n % len(STATES)]
+
+
+async def seed(size: int) -> range:
+    """Make sure exactly ``size`` fleet rows exist; return their id range."""
+    async with database.connection() as conn:
+        cur = await conn.execute(
+            "SELECT count(*) AS n, min(id) AS first, max(id) AS last FROM servers WHERE hostname LIKE %s",
+            (PREFIX + "0%",),
+        )
+        fleet = await cur.fetchone()
+        if fleet["n"] != size or fleet["last"] - fleet["first"] + 1 != size:
+            print(f"seeding {size} servers...", file=sys.stderr)
+            started = time.perf_counter()
+            async with conn.transaction():
+                await conn.execute("DELETE FROM servers WHERE hostname LIKE %s", (PREFIX + "%",))
+                async with conn.cursor().copy(
+                    "COPY servers (hostname, ip_address, state) FROM STDIN"
+                ) as copy:
+                    for n in range(size):
+                        await copy.write_row(fleet_row(n))
+            await conn.execute("ANALYZE servers")
+            print(f"seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+            return await seed(size)
+    return range(fleet["first"], fleet["last"] + 1)
+
+
+async def cleanup(drop_fleet: bool):
+    async with database.connection() as conn:
+        await conn.execute("DELETE FROM servers WHERE hostname LIKE %s", (NEW_PREFIX + "%",))
+        if drop_fleet:
+            await conn.execute("DELETE FROM servers WHERE hostname LIKE %s", (PREFIX + "%",))
+
+
+def expect(response: httpx.Response, *codes: int) -> httpx.Response:
+    if response.status_code not in codes:
+        raise RuntimeError(f"{response.request.method} {response.request.url}: {response.status_code} {response.text[:200]}")
+    return response
+
+
+def scenarios(ids: range) -> Dict[str, Scenario]:
+    """Every endpoint, each a request factory ``(client, rng) -> response``.
+
+    Write scenarios add rows under ``NEW_PREFIX``; ``delete`` and
+    ``bulk-delete`` consume the rows created before them and stop early
+    once none are left.
+    """
+    size = len(ids)
+    created: collections.deque = collections.deque()
+    counter = iter(range(10**9))
+
+    def new_server(rng):
+        n = next(counter)
+        return {"hostname": f"{NEW_PREFIX}{n}", "ip_address": f"10.250.{n >> 8 & 255}.{n & 255}", "state": "active"}
+
+    async def get(client, rng):
+        return expect(await client.get(f"/servers/{rng.choice(ids)}"), 200)
+
+    async def list_(client, rng):
+        return expect(await client.get("/servers/", params={"limit": 50}), 200)
+
+    etags: dict = {}
+
+    async def list_not_modified(client, rng):
+        # A dashboard poll of an unchanged page: 304 after one version lookup
+        headers = {"If-None-Match": etags["list"]} if "list" in etags else {}
+        response = expect(await client.get("/servers/", params={"limit": 50}, headers=headers), 200, 304)
+        etags["list"] = response.headers["ETag"]
+        return response
+
+    async def list_offset(client, rng):
+        return expect(await client.get("/servers/", params={"limit": 50, "offset": size // 2}), 200)
+
+    async def list_cursor(client, rng):
+        cursor = encode_cursor(rng.choice(ids), {})
+        return expect(await client.get("/servers/", params={"limit": 50, "cursor": cursor}), 200)
+
+    async def list_state(client, rng):
+        return expect(await client.get("/servers/", params={"limit": 50, "state": "offline"}), 200)
+
+    async def list_contains(client, rng):
+        needle = f"{rng.randrange(1000):03d}"
+        return expect(await client.get("/servers/", params={"limit": 50, "hostname_contains": needle}), 200)
+
+    async def list_prefix(client, rng):
+        prefix = f"{PREFIX}{rng.randrange(min(size, 10**7) // 1000 or 1):04d}"
+        return expect(await client.get("/servers/", params={"limit": 50, "hostname_prefix": prefix}), 200)
+
+    async def list_subnet(client, rng):
+        subnet = fleet_ip(rng.randrange(size) & ~255) + "/24"
+        return expect(await client.get("/servers/", params={"limit": 50, "subnet": subnet}), 200)
+
+    async def by_ip(client, rng):
+        return expect(await client.get(f"/servers/by-ip/{fleet_ip(rng.randrange(size))}"), 200)
+
+    async def stats(client, rng):
+        return expect(await client.get("/servers/stats"), 200)
+
+    async def stats_by_subnet(client, rng):
+        return expect(await client.get("/servers/stats", params={"by_subnet": "true"}), 200)
+
+    async def export(client, rng, fmt):
+        # The first 1000 fleet servers, streamed to the end
+        params = {"format": fmt, "hostname_prefix": PREFIX + "0000"}
+        async with client.stream("GET", "/servers/export", params=params) as response:
+            expect(response, 200)
+            async for _ in response.aiter_bytes():
+                pass
+        return response
+
+    async def create(client, rng):
+        response = expect(await client.post("/servers/", json=new_server(rng)), 201)
+        created.append(response.json()["id"])
+        return response
+
+    async def bulk_create(client, rng):
+        body = [new_server(rng) for _ in range(100)]
+        response = expect(await client.post("/servers/bulk", json=body), 200)
+        created.extend(item["id"] for item in response.json()["created"])
+        return response
+
+    async def update(client, rng):
+        body = {"state": rng.choice(("active", "offline"))}
+        return expect(await client.put(f"/servers/{rng.choice(ids)}", json=body), 200)
+
+    async def bulk_update(client, rng):
+        body = {"ids": rng.sample(ids, min(50, size)), "state": rng.choice(("active", "offline"))}
+        return expect(await client.patch("/servers/bulk", json=body), 200)
+
+    async def delete(client, rng):
+        if not created:
+            return None
+        return expect(await client.delete(f"/servers/{created.popleft()}"), 204)
+
+    async def bulk_delete(client, rng):
+        batch = [created.popleft() for _ in range(min(10, len(created)))]
+        if not batch:
+            return None
+        return expect(await client.post("/servers/bulk-delete", json={"ids": batch}), 200)
+
+    return {
+        "get": get,
+        "list": list_,
+        "list-304": list_not_modified,
+        "list-offset": list_offset,
+        "list-cursor": list_cursor,
+        "list-state": list_state,
+        "list-contains": list_contains,
+        "list-prefix": list_prefix,
+        "list-subnet": list_subnet,
+        "by-ip": by_ip,
+        "stats": stats,
+        "stats-by-subnet": stats_by_subnet,
+        "export-ndjson": lambda client, rng: export(client, rng, "ndjson"),
+        "export-csv": lambda client, rng: export(client, rng, "csv"),
+        "create": create,
+        "bulk-create": bulk_create,
+        "update": update,
+        "bulk-update": bulk_update,
+        "delete": delete,
+        "bulk-delete": bulk_delete,
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run(client, scenario: Scenario, seconds: float, concurrency: int, seed_value: int) -> dict:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + seconds
+
+    async def worker(n):
+        rng = random.Random(seed_value * 1000 + n)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if await scenario(client, rng) is None:
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Print the change against ``baseline``; return the regressed scenarios."""
+    regressed = []
+    print(f"\nvs baseline ({baseline['meta'].get('revision')}, {baseline['meta']['timestamp']}):")
+    for name, current in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before or not before["requests"] or not current["requests"]:
+            continue
+        rps_change = (current["rps"] / before["rps"] - 1) * 100
+        p95_change = (current["p95_ms"] / before["p95_ms"] - 1) * 100
+        worse = rps_change < -max_regression or p95_change > max_regression
+        if worse:
+            regressed.append(name)
+        print(f"  {name:<16} rps {rps_change:+6.1f}%   p95 {p95_change:+6.1f}%{'   REGRESSION' if worse else ''}")
+    return regressed
+
+
+async def open_client(args, stack: AsyncExitStack) -> httpx.AsyncClient:
+    """Client for the target, with the database pool open for seeding."""
+    if args.url:
+        await database.init_pool()
+        stack.push_async_callback(database.close_pool)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        return await stack.enter_async_context(httpx.AsyncClient(base_url=args.url, limits=limits))
+
+    from app.main import app
+
+    # The app's own lifespan opens the pool, as it would in a worker
+    await stack.enter_async_context(app.router.lifespan_context(app))
+    # Its logging setup would otherwise print every request httpx makes
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    transport = httpx.ASGITransport(app=app)
+    return await stack.enter_async_context(httpx.AsyncClient(transport=transport, base_url="http://bench"))
+
+
+async def main(args) -> int:
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "target": args.url or "in-process",
+            "fleet_size": args.fleet_size,
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+    async with AsyncExitStack() as stack:
+        client = await open_client(args, stack)
+        stack.push_async_callback(cleanup, args.drop_fleet)
+        ids = await seed(args.fleet_size)
+        print(f"{'scenario':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, scenario in scenarios(ids).items():
+            if args.scenario and name not in args.scenario:
+                continue
+            await run(client, scenario, args.warmup, args.concurrency, args.seed)
+            result = await run(client, scenario, args.seconds, args.concurrency, args.seed)
+            results["scenarios"][name] = result
+            print(f"{name:<16} {result['rps']:8.0f} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            if compare(results, json.load(f), args.max_regression):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fleet-size", type=fleet_size, default="10k", help="10k, 100k, 1m or a number")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for ids and filters")
+    parser.add_argument("--scenario", action="append", help="Only run these scenarios")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", help="Save results as JSON")
+    parser.add_argument("--baseline", help="Compare with results saved by --output")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Percent tolerated by --baseline")
+    parser.add_argument("--drop-fleet", action="store_true", help="Delete the seeded fleet afterwards")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,101 @@
+"""Microbenchmark: conditional UPDATE before and after row versions.
+
+Old path: SELECT the row, hash it with ``generate_etag``, compare with
+If-Match, then UPDATE (two round trips plus MD5 per request).
+New path: one ``UPDATE ... WHERE id = %s AND version = %s`` wrapped so the
+same round trip tells 404 from 412.
+
+Usage (needs a database with the current schema):
+
+    python -m benchmarks.bench_conditional_write --iterations 2000
+"""
+import argparse
+import time
+
+import psycopg
+from psycopg.rows import dict_row
+
+from app.config import settings
+from app.etag import etag_matches, generate_etag
+from app.routers import _conditional_write
+
+HOSTNAME = "bench-conditional-write"
+
+
+def old_path(conn, server_id: int, if_match: str) -> str:
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, hostname, ip_address, state, created_at FROM servers WHERE id = %s",
+            (server_id,)
+        )
+        current = cur.fetchone()
+        if not etag_matches(generate_etag(current), if_match):
+            raise RuntimeError("412")
+        cur.execute(
+            """
+            UPDATE servers SET state = %s WHERE id = %s
+            RETURNING id, hostname, ip_address, state, created_at
+            """,
+            ("active", server_id)
+        )
+        updated = cur.fetchone()
+        conn.commit()
+        return generate_etag(updated)
+
+
+def new_path(conn, server_id: int, version: int) -> int:
+    query = _conditional_write("""
+        UPDATE servers SET state = %s WHERE id = %s AND version = %s
+        RETURNING id, hostname, ip_address, state, created_at, version
+    """)
+    with conn.cursor() as cur:
+        cur.execute(query, (server_id, "active", server_id, version))
+        updated = cur.fetchone()
+        if updated["id"] is None:
+            raise RuntimeError("412" if updated["found"] else "404")
+        conn.commit()
+        return updated["version"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with psycopg.connect(settings.DATABASE_URL, row_factory=dict_row) as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM servers WHERE hostname = %s", (HOSTNAME,))
+            cur.execute(
+                """
+                INSERT INTO servers (hostname, ip_address, state) VALUES (%s, '192.0.2.1', 'active')
+                RETURNING id, hostname, ip_address, state, created_at, version
+                """,
+                (HOSTNAME,)
+            )
+            row = cur.fetchone()
+            conn.commit()
+
+        try:
+            etag = generate_etag({k: v for k, v in row.items() if k != "version"})
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                etag = old_path(conn, row["id"], etag)
+            old = (time.perf_counter() - started) / args.iterations
+
+            version = row["version"] + args.iterations
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                version = new_path(conn, row["id"], version)
+            new = (time.perf_counter() - started) / args.iterations
+        finally:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM servers WHERE id = %s", (row["id"],))
+                conn.commit()
+
+    print(f"old (SELECT + md5 ETag + UPDATE): {old * 1e6:8.1f} us/op")
+    print(f"new (single versioned UPDATE):    {new * 1e6:8.1f} us/op")
+    print(f"speedup: {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
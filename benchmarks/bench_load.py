@@ -0,0 +1,119 @@
+"""Load benchmark: requests/sec for the hot endpoints against a real database.
+
+Drives the full app in-process (``httpx`` + ``ASGITransport``, no sockets)
+with ``--concurrency`` clients sharing one connection pool, and reports
+requests per second for each scenario:
+
+- ``get``: ``GET /servers/{id}`` with the per-worker cache disabled, so
+  every request reaches the database
+- ``list``: ``GET /servers?limit=50``
+- ``update``: ``PUT /servers/{id}``
+- ``create``: ``POST /servers``
+
+Usage (needs a database with the current schema; seeded rows are removed
+afterwards):
+
+    python -m benchmarks.bench_load --seconds 5 --concurrency 8
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+import httpx
+
+from app import database
+from app.cache import server_cache
+from app.main import app
+
+PREFIX = "bench-load-"
+SEED_ROWS = 1000
+
+
+async def seed(client: httpx.AsyncClient) -> list:
+    ndjson = "\n".join(
+        f'{{"hostname": "{PREFIX}{n}", "ip_address": "10.99.{n // 256}.{n % 256}", "state": "active"}}'
+        for n in range(SEED_ROWS)
+    )
+    response = await client.post(
+        "/servers/bulk", content=ndjson, headers={"Content-Type": "application/x-ndjson"}
+    )
+    response.raise_for_status()
+    return [item["id"] for item in response.json()["created"]]
+
+
+async def cleanup():
+    async with database.connection() as conn:
+        await conn.execute("DELETE FROM servers WHERE hostname LIKE %s", (PREFIX + "%",))
+        await conn.commit()
+
+
+def scenarios(ids: list):
+    counter = itertools.count()
+
+    async def get(client):
+        response = await client.get(f"/servers/{random.choice(ids)}")
+        assert response.status_code == 200, response.text
+
+    async def list_(client):
+        response = await client.get("/servers/", params={"limit": 50})
+        assert response.status_code == 200, response.text
+
+    async def update(client):
+        state = random.choice(("active", "offline"))
+        response = await client.put(f"/servers/{random.choice(ids)}", json={"state": state})
+        assert response.status_code == 200, response.text
+
+    async def create(client):
+        n = next(counter)
+        response = await client.post("/servers/", json={
+            "hostname": f"{PREFIX}new-{n}",
+            "ip_address": f"10.98.{n // 256 % 256}.{n % 256}",
+            "state": "active",
+        })
+        assert response.status_code == 201, response.text
+
+    return {"get": get, "list": list_, "update": update, "create": create}
+
+
+async def run(client, request, seconds: float, concurrency: int) -> float:
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await request(client)
+            done += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / (time.perf_counter() - started)
+
+
+async def main(args):
+    server_cache.enabled = False
+    await database.init_pool()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await cleanup()
+            ids = await seed(client)
+            for name, request in scenarios(ids).items():
+                if args.scenario and name not in args.scenario:
+                    continue
+                await run(client, request, 0.5, args.concurrency)  # warm up
+                rate = await run(client, request, args.seconds, args.concurrency)
+                print(f"{name:<8} {rate:8.0f} req/s")
+    finally:
+        await cleanup()
+        await database.close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenario", action="append", choices=["get", "list", "update", "create"])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""Microbenchmark: request-ID middleware before and after going pure ASGI.
+
+Drives a minimal Starlette app directly through the ASGI interface (no
+sockets) with each middleware stack and reports the cost per request:
+
+- ``none``: the bare app, for reference
+- ``base-http``: the previous ``BaseHTTPMiddleware`` request-ID layer
+  (no metrics were recorded at all)
+- ``asgi``: the current ``RequestIDMiddleware``, which also records
+  request count and latency metrics
+
+Usage:
+
+    python -m benchmarks.bench_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.middleware import RequestIDMiddleware, request_id_ctx
+
+
+class BaseHTTPRequestIDMiddleware(BaseHTTPMiddleware):
+    """The request-ID middleware as it was before the pure ASGI rewrite."""
+
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
+        token = request_id_ctx.set(request_id)
+        try:
+            response = await call_next(request)
+            response.headers["X-Request-ID"] = request_id
+            return response
+        finally:
+            request_id_ctx.reset(token)
+
+
+async def get_server(request: Request):
+    return JSONResponse({"id": int(request.path_params["server_id"]), "hostname": "web-01"})
+
+
+def build_app(middleware):
+    app = Starlette(routes=[Route("/servers/{server_id}", get_server)])
+    if middleware:
+        app.add_middleware(middleware)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/servers/1",
+        "raw_path": b"/servers/1",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    stacks = {
+        "none": None,
+        "base-http": BaseHTTPRequestIDMiddleware,
+        "asgi": RequestIDMiddleware,
+    }
+    for name, middleware in stacks.items():
+        app = build_app(middleware)
+        await drive(app, 1000)  # warm up
+        per_request = await drive(app, args.requests)
+        print(f"{name:10s} {per_request * 1e6:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Microbenchmark: cost per row of turning list rows into a JSON response body.
+
+Rows are built the way psycopg returns them (aware ``datetime`` values,
+``inet`` as ``IPv4Address`` by default) and encoded with:
+
+- ``response_model``: what FastAPI does for ``response_model=List[Server]``,
+  i.e. validate every row into ``Server`` and dump it with pydantic
+- ``jsonable``: ``jsonable_encoder`` + stdlib ``json.dumps`` (the path used
+  by FastAPI versions before direct pydantic serialization)
+- ``orjson``: ``app.responses.dumps`` on the same rows
+- ``orjson-text-inet``: ``app.responses.dumps`` on rows with ``inet`` loaded
+  as text, as pooled connections return them and ``RowJSONResponse``
+  encodes them now
+
+No database needed:
+
+    python -m benchmarks.bench_serialization --rows 100 --rows 1000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from ipaddress import IPv4Address
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import Server
+from app.responses import dumps
+
+SERVERS = TypeAdapter(List[Server])
+
+
+def make_rows(count: int, text_inet: bool = False) -> list:
+    created_at = datetime(2024, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+    load_inet = str if text_inet else IPv4Address
+    return [
+        {
+            "id": n,
+            "hostname": f"web-{n:05d}.example.internal",
+            "ip_address": load_inet(IPv4Address(0x0A000000 + n)),
+            "state": "active",
+            "created_at": created_at,
+        }
+        for n in range(count)
+    ]
+
+
+ENCODERS = {
+    "response_model": lambda rows: SERVERS.dump_json(SERVERS.validate_python(rows)),
+    "jsonable": lambda rows: json.dumps(jsonable_encoder(SERVERS.validate_python(rows))).encode(),
+    "orjson": dumps,
+    "orjson-text-inet": dumps,
+}
+
+
+def per_row(encode, rows: list, seconds: float) -> float:
+    loops = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        encode(rows)
+        loops += 1
+    return (time.perf_counter() - started) / (loops * len(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, action="append")
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    for count in args.rows or [100, 1000]:
+        rows = {text_inet: make_rows(count, text_inet) for text_inet in (False, True)}
+        results = {
+            name: per_row(encode, rows[name.endswith("text-inet")], args.seconds)
+            for name, encode in ENCODERS.items()
+        }
+        baseline = results["response_model"]
+        print(f"{count} rows per page:")
+        for name, cost in results.items():
+            print(f"  {name:<17} {cost * 1e6:6.2f} us/row  ({baseline / cost:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
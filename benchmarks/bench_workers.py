@@ -0,0 +1,114 @@
+"""Throughput benchmark: requests/sec of ``app.serve`` at 1, 2, 4 and 8 workers.
+
+For every worker count the server is started as a real process
+(``python -m app.serve``) on a local port and driven over HTTP by
+``--concurrency`` keep-alive clients, first with ``GET /servers/{id}`` and
+then with ``GET /servers?limit=50``. The server is stopped with SIGTERM
+between runs, so graceful shutdown is exercised too.
+
+Scaling is bounded by the CPUs available (the load generator runs on the
+same machine) and by the database.
+
+Usage (needs a database with the current schema; seeded rows are removed
+afterwards):
+
+    python -m benchmarks.bench_workers --workers 1 --workers 4 --seconds 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app import database
+from benchmarks.bench_load import cleanup, seed
+
+PORT = 8765
+
+
+def start_server(workers: int) -> subprocess.Popen:
+    # Cache disabled so every GET reaches a worker's pool, not its LRU
+    env = {**os.environ, "SERVER_CACHE_SIZE": "0"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(PORT)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+async def run(client, path, seconds: float, concurrency: int) -> float:
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            response = await client.get(path())
+            assert response.status_code == 200, response.text
+            done += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / (time.perf_counter() - started)
+
+
+async def bench(workers: int, args, ids: list) -> dict:
+    server = start_server(workers)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits) as client:
+            await wait_ready(client)
+            if not ids:
+                ids.extend(await seed(client))
+            paths = {
+                "get": lambda: f"/servers/{random.choice(ids)}",
+                "list": lambda: "/servers/?limit=50",
+            }
+            results = {}
+            for name, path in paths.items():
+                await run(client, path, 0.5, args.concurrency)  # warm up every worker
+                results[name] = await run(client, path, args.seconds, args.concurrency)
+            return results
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+async def main(args):
+    await database.init_pool()
+    try:
+        await cleanup()
+        ids: list = []
+        print(f"{'workers':>7} {'get req/s':>10} {'list req/s':>11}")
+        for workers in args.workers or [1, 2, 4, 8]:
+            results = await bench(workers, args, ids)
+            print(f"{workers:>7} {results['get']:>10.0f} {results['list']:>11.0f}")
+    finally:
+        await cleanup()
+        await database.close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, action="append")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,175 @@
+"""Microbenchmarks for CPU work done on every request (pytest-benchmark).
+
+No database needed. Run, save a baseline, and later fail on regressions:
+
+    make bench-micro-baseline   # on the base commit
+    make bench-micro            # fails if a best time got >25% slower
+
+Plain ``pytest benchmarks/micro --benchmark-disable`` runs each body once,
+as a smoke test.
+"""
+import asyncio
+import hashlib
+import json
+import timeit
+from datetime import datetime, timezone
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.etag import collection_etag, etag_matches, etag_none_match, etag_version, generate_etag, version_etag
+from app.middleware import RequestIDMiddleware
+from app.models import Server
+from app.responses import dumps
+from app.watch import WatchHub
+from cli.main import OutputFormat, format_output
+
+CREATED_AT = datetime(2024, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+ROW = {"id": 42, "hostname": "web-00042.example.internal", "ip_address": "10.0.0.42", "state": "active", "created_at": CREATED_AT}
+PAGE = [dict(ROW, id=n, hostname=f"web-{n:05d}.example.internal") for n in range(100)]
+SERVERS = TypeAdapter(List[Server])
+
+
+def legacy_generate_etag(data: dict) -> str:
+    """``generate_etag`` before BLAKE2b: dict rebuild, sorted JSON, MD5."""
+    serializable = {}
+    for key, value in data.items():
+        if hasattr(value, 'isoformat'):
+            serializable[key] = value.isoformat()
+        else:
+            serializable[key] = str(value) if value is not None else None
+    content = json.dumps(serializable, sort_keys=True)
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+# ETags
+@pytest.mark.benchmark(group="etag")
+@pytest.mark.parametrize("implementation", [generate_etag, legacy_generate_etag], ids=["blake2", "legacy-md5"])
+def test_generate_etag(benchmark, implementation):
+    assert len(benchmark(implementation, ROW)) == 32
+
+
+def test_generate_etag_cheaper_than_legacy():
+    """Gate that needs no saved baseline: the fast ETag must stay well ahead."""
+    def best(func):
+        return min(timeit.repeat(lambda: func(ROW), number=2000, repeat=5))
+
+    assert best(generate_etag) < best(legacy_generate_etag) * 0.8
+
+
+@pytest.mark.benchmark(group="etag")
+def test_version_etag(benchmark):
+    assert benchmark(version_etag, 12345) == "v12345"
+
+
+@pytest.mark.benchmark(group="etag")
+def test_collection_etag(benchmark):
+    params = [("state", "active"), ("limit", "50"), ("hostname_prefix", "web-")]
+    assert benchmark(collection_etag, 12345, params).startswith("c12345-")
+
+
+@pytest.mark.benchmark(group="conditional-headers")
+def test_parse_if_match(benchmark):
+    assert benchmark(etag_version, ' W/"v12345" ') == 12345
+
+
+@pytest.mark.benchmark(group="conditional-headers")
+def test_if_none_match(benchmark):
+    assert benchmark(etag_none_match, "v12345", '"v12345"')
+
+
+@pytest.mark.benchmark(group="conditional-headers")
+def test_etag_matches(benchmark):
+    assert benchmark(etag_matches, "v12345", 'W/"v12345"')
+
+
+# Middleware
+def _asgi_runner(app, requests: int = 100):
+    """A callable sending ``requests`` GETs straight through the ASGI interface."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/servers/1",
+        "raw_path": b"/servers/1",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def drive():
+        for _ in range(requests):
+            await app(dict(scope), receive, send)
+
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(drive()), loop
+
+
+@pytest.mark.benchmark(group="middleware-100-requests")
+@pytest.mark.parametrize("middleware", [None, RequestIDMiddleware], ids=["bare", "request-id"])
+def test_request_id_middleware(benchmark, middleware):
+    async def get_server(request):
+        return JSONResponse(ROW | {"created_at": None})
+
+    app = Starlette(routes=[Route("/servers/{server_id}", get_server)])
+    if middleware:
+        app.add_middleware(middleware)
+    run, loop = _asgi_runner(app)
+    try:
+        benchmark(run)
+    finally:
+        loop.close()
+
+
+# Serialization
+@pytest.mark.benchmark(group="serialize-100-rows")
+def test_validate_servers(benchmark):
+    """What ``response_model=List[Server]`` costs per page."""
+    assert len(benchmark(lambda: SERVERS.dump_json(SERVERS.validate_python(PAGE)))) > 0
+
+
+@pytest.mark.benchmark(group="serialize-100-rows")
+def test_orjson_rows(benchmark):
+    """``RowJSONResponse``, which list and get now use."""
+    assert len(benchmark(dumps, PAGE)) > 0
+
+
+# Watch fan-out
+@pytest.mark.benchmark(group="watch-fan-out")
+@pytest.mark.parametrize("subscribers", [100, 1000])
+def test_watch_fan_out(benchmark, subscribers):
+    """One notification queued for the subscribers of a worker, across 50 filters."""
+    hub = WatchHub(queue_size=1, max_subscribers=subscribers)
+    watchers = [hub.subscribe({"hostname_prefix": f"web-{n % 50:02d}"}) for n in range(subscribers)]
+    row = {key: str(value) for key, value in ROW.items()} | {"id": 42}
+    change = {"op": "UPDATE", "id": 42, "server": row, "old": dict(row, state="offline")}
+
+    def fan_out():
+        for watcher in watchers:
+            if not watcher.queue.empty():
+                watcher.queue.get_nowait()
+        hub.handle_change(change)
+
+    benchmark(fan_out)
+    assert len(hub) == subscribers
+
+
+# CLI output
+@pytest.mark.benchmark(group="cli-format-100-rows")
+@pytest.mark.parametrize("fmt", [OutputFormat.table, OutputFormat.json, OutputFormat.ndjson])
+def test_format_output(benchmark, fmt):
+    assert benchmark(format_output, PAGE, fmt)
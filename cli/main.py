@@ -1,18 +1,36 @@
-import typer
-import requests
+import csv
 import json
+import os
+import random
+import sys
 import time
-from typing import Optional
 from enum import Enum
-from functools import wraps
+from functools import lru_cache, wraps
+from itertools import islice
+from pathlib import Path
+from textwrap import indent
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+import typer
+
+# The CLI is run thousands of times by automation, so startup matters:
+# requests is only imported by commands that talk to the API (see http()),
+# and rich (help panels, pretty tracebacks) only for interactive terminals.
+# Piped output keeps plain click formatting, which imports nothing extra.
+_interactive = sys.stdout.isatty()
 
-app = typer.Typer(help="Server Inventory CLI - Manage your server fleet")
+app = typer.Typer(
+    help="Server Inventory CLI - Manage your server fleet",
+    rich_markup_mode="rich" if _interactive else None,
+    pretty_exceptions_enable=_interactive,
+)
 
 API_URL = "http://localhost:8000/servers"
 
 # Output format options
 class OutputFormat(str, Enum):
     json = "json"
+    ndjson = "ndjson"
     table = "table"
 
 class ServerState(str, Enum):
@@ -20,31 +38,153 @@ class ServerState(str, Enum):
     offline = "offline"
     retired = "retired"
 
+class FileFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+SERVER_FIELDS = ["id", "hostname", "ip_address", "state", "created_at"]
+
+
+# Most requests a batch command runs at once, and the size of the session's
+# connection pool, so no worker thread ever waits for a connection
+MAX_CONCURRENCY = 32
+
+# Responses that mean "try again later"; Retry-After is honoured up to a cap
+RETRY_STATUSES = {429, 503}
+MAX_RETRY_AFTER = 60.0
+
+
+@lru_cache(maxsize=None)
+def http():
+    """Shared keep-alive session, built on first use (``--help`` never imports requests).
+
+    Every request of a run, including those from batch worker threads,
+    reuses the session's pooled connections instead of opening a new one.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def retry_after(response) -> Optional[float]:
+    """Seconds the server asked us to wait in ``Retry-After``, if any."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
 
 def retry_with_backoff(max_retries: int = 3, base_delay: float = 1.0):
-    """Decorator for exponential backoff retry on connection errors."""
+    """Decorator retrying an HTTP call on connection errors and 429/503 responses.
+
+    Waits as long as ``Retry-After`` says, otherwise a random delay of up to
+    ``base_delay * 2**attempt`` (full jitter), so clients that failed
+    together do not retry in lockstep. A 429/503 still returned by the last
+    attempt is handed to the caller; a connection error exits.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
-            for attempt in range(max_retries):
+            import requests
+
+            for attempt in range(1, max_retries + 1):
                 try:
-                    return func(*args, **kwargs)
+                    response = func(*args, **kwargs)
                 except requests.exceptions.ConnectionError as e:
-                    last_exception = e
-                    delay = base_delay * (2 ** attempt)
-                    typer.echo(f"Connection failed, retrying in {delay}s... (attempt {attempt + 1}/{max_retries})", err=True)
-                    time.sleep(delay)
-            typer.echo(f"Failed after {max_retries} attempts: {last_exception}", err=True)
-            raise typer.Exit(1)
+                    if attempt == max_retries:
+                        typer.echo(f"Failed after {max_retries} attempts: {e}", err=True)
+                        raise typer.Exit(1)
+                    reason, delay = "Connection failed", None
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                        return response
+                    reason, delay = f"Server busy ({response.status_code})", retry_after(response)
+                if delay is None:
+                    delay = random.uniform(0, base_delay * 2 ** (attempt - 1))
+                typer.echo(f"{reason}, retrying in {delay:.1f}s... (attempt {attempt}/{max_retries})", err=True)
+                time.sleep(delay)
         return wrapper
     return decorator
 
 
+@retry_with_backoff()
+def send(method: str, url: str, **kwargs):
+    """Send one request through the shared session."""
+    return getattr(http(), method)(url, **kwargs)
+
+
+def read_ids(ids: Optional[List[int]], ids_option: Optional[str], from_file: Optional[Path]) -> List[int]:
+    """Server IDs from arguments, ``--ids 1,2,3`` and ``--from-file``, without duplicates."""
+    values = [str(server_id) for server_id in ids or []]
+    if ids_option:
+        values += ids_option.split(",")
+    if from_file:
+        lines = sys.stdin if str(from_file) == "-" else from_file.read_text().splitlines()
+        values += lines
+    try:
+        result = [int(value) for value in values if value.strip()]
+    except ValueError as e:
+        raise typer.BadParameter(f"Server IDs must be integers ({e})")
+    if not result:
+        raise typer.BadParameter("Give at least one server ID, --ids or --from-file")
+    return list(dict.fromkeys(result))
+
+
+def fan_out(func: Callable, items: Iterable, concurrency: int) -> list:
+    """``[func(item) for item in items]``, run on a bounded thread pool."""
+    items = list(items)
+    if concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as pool:
+        return list(pool.map(func, items))
+
+
+def chunks(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def report_bulk(action: str, responses: list):
+    """Sum up bulk endpoint results; exit 1 if any server was not changed."""
+    affected, failed = 0, False
+    for response in responses:
+        if response.status_code >= 400:
+            typer.echo(f"Error: {response.text}", err=True)
+            failed = True
+            continue
+        result = response.json()
+        affected += len(result["affected"])
+        for server_id in result["not_found"]:
+            typer.echo(f"Error: Server {server_id} not found", err=True)
+            failed = True
+    typer.echo(f"✓ {action} {affected} servers.")
+    if failed:
+        raise typer.Exit(1)
+
+
 def format_output(data, fmt: OutputFormat):
     """Format output based on user preference."""
     if fmt == OutputFormat.json:
         return json.dumps(data, indent=2, default=str)
+    elif fmt == OutputFormat.ndjson:
+        items = data if isinstance(data, list) else [data]
+        return "\n".join(json.dumps(item, default=str) for item in items)
     else:
         # Table format
         if isinstance(data, list):
@@ -62,7 +202,6 @@ def format_output(data, fmt: OutputFormat):
 
 
 @app.command()
-@retry_with_backoff()
 def create(
     hostname: str,
     ip_address: str,
@@ -75,57 +214,147 @@ def create(
         "ip_address": ip_address,
         "state": state.value
     }
-    response = requests.post(API_URL, json=payload)
+    response = send("post", API_URL, json=payload)
     if response.status_code >= 400:
         typer.echo(f"Error: {response.text}", err=True)
         raise typer.Exit(1)
     typer.echo(format_output(response.json(), format))
 
 
+def iter_pages(params: dict) -> Iterator[list]:
+    """Walk the cursor pages of ``GET /servers``.
+
+    The next page is requested in the background as soon as its cursor is
+    known, so it downloads while the caller renders the current one.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fetch(cursor: Optional[str]):
+        response = send("get", API_URL, params=dict(params, cursor=cursor) if cursor else params)
+        response.raise_for_status()
+        return response.json(), response.headers.get("X-Next-Cursor")
+
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        next_page = prefetch.submit(fetch, None)
+        while next_page:
+            page, cursor = next_page.result()
+            next_page = prefetch.submit(fetch, cursor) if cursor else None
+            yield page
+
+
+def write_pages(pages: Iterable[list], fmt: OutputFormat):
+    """Print servers page by page, as ``format_output`` would print them all.
+
+    Only one page is ever held in memory, so this scales to any fleet size.
+    """
+    written, headers = 0, None
+    if fmt == OutputFormat.json:
+        typer.echo("[", nl=False)
+    for page in pages:
+        if not page:
+            continue
+        if fmt == OutputFormat.json:
+            text = "".join(
+                ("," if written or n else "") + "\n" + indent(json.dumps(item, indent=2, default=str), "  ")
+                for n, item in enumerate(page)
+            )
+        elif fmt == OutputFormat.ndjson:
+            text = "".join(json.dumps(item, default=str) + "\n" for item in page)
+        else:
+            text = ""
+            if headers is None:
+                headers = list(page[0].keys())
+                header = " | ".join(headers)
+                text = f"{header}\n{'-' * len(header)}\n"
+            text += "".join(" | ".join(str(item.get(h, "")) for h in headers) + "\n" for item in page)
+        typer.echo(text, nl=False)
+        written += len(page)
+    if fmt == OutputFormat.json:
+        typer.echo("\n]" if written else "]")
+    elif fmt == OutputFormat.table and not written:
+        typer.echo("No servers found.")
+
+
 @app.command("list")
-@retry_with_backoff()
 def list_servers(
     format: OutputFormat = typer.Option(OutputFormat.table, "--format", "-f", help="Output format"),
     state: Optional[str] = typer.Option(None, "--state", "-s", help="Filter by state"),
-    hostname: Optional[str] = typer.Option(None, "--hostname", "-h", help="Filter by hostname (contains)")
+    hostname: Optional[str] = typer.Option(None, "--hostname", "-h", help="Filter by hostname (contains)"),
+    all_pages: bool = typer.Option(False, "--all", "-a", help="Fetch every page, not just the first"),
+    page_size: Optional[int] = typer.Option(None, "--page-size", min=1, help="Servers per request (default: 1000 with --all, else the API's)"),
 ):
-    """List all servers with optional filtering."""
+    """List servers with optional filtering.
+
+    Without --all only the first page is shown. With --all every page is
+    fetched (the next one while the current one prints) and written to
+    stdout as it arrives; use --format ndjson to pipe large fleets to jq.
+    """
     params = {}
     if state:
         params["state"] = state
     if hostname:
         params["hostname_contains"] = hostname
-    
-    response = requests.get(API_URL, params=params)
+    if page_size or all_pages:
+        params["limit"] = page_size or 1000
+
+    if all_pages:
+        write_pages(iter_pages(params), format)
+        return
+
+    response = send("get", API_URL, params=params)
     response.raise_for_status()
-    typer.echo(format_output(response.json(), format))
+    write_pages([response.json()], format)
+    if response.headers.get("X-Next-Cursor"):
+        typer.echo("More servers available; use --all to list them all.", err=True)
+
+
+IDS_HELP = "Comma-separated server IDs"
+FROM_FILE_HELP = "File with one server ID per line ('-' for stdin)"
+CONCURRENCY_HELP = "Requests in flight at once"
 
 
 @app.command()
-@retry_with_backoff()
 def get(
-    server_id: int,
+    server_ids: Optional[List[int]] = typer.Argument(None, help="Server IDs"),
+    ids: Optional[str] = typer.Option(None, "--ids", help=IDS_HELP),
+    from_file: Optional[Path] = typer.Option(None, "--from-file", help=FROM_FILE_HELP),
+    concurrency: int = typer.Option(8, "--concurrency", "-c", min=1, max=MAX_CONCURRENCY, help=CONCURRENCY_HELP),
     format: OutputFormat = typer.Option(OutputFormat.table, "--format", "-f", help="Output format")
 ):
-    """Get a specific server by ID."""
-    response = requests.get(f"{API_URL}/{server_id}")
-    if response.status_code == 404:
-        typer.echo(f"Error: Server {server_id} not found", err=True)
+    """Get servers by ID; several IDs are fetched concurrently."""
+    server_ids = read_ids(server_ids, ids, from_file)
+    responses = fan_out(lambda server_id: send("get", f"{API_URL}/{server_id}"), server_ids, concurrency)
+    servers = []
+    for server_id, response in zip(server_ids, responses):
+        if response.status_code == 404:
+            typer.echo(f"Error: Server {server_id} not found", err=True)
+            continue
+        response.raise_for_status()
+        servers.append(response.json())
+    if len(server_ids) > 1:
+        typer.echo(format_output(servers, format))
+    elif servers:
+        typer.echo(format_output(servers[0], format))
+    if len(servers) < len(server_ids):
         raise typer.Exit(1)
-    response.raise_for_status()
-    typer.echo(format_output(response.json(), format))
 
 
 @app.command()
-@retry_with_backoff()
 def update(
-    server_id: int,
+    server_ids: Optional[List[int]] = typer.Argument(None, help="Server IDs"),
     hostname: Optional[str] = typer.Option(None, "--hostname"),
     ip_address: Optional[str] = typer.Option(None, "--ip"),
     state: Optional[ServerState] = typer.Option(None, "--state"),
+    ids: Optional[str] = typer.Option(None, "--ids", help=IDS_HELP),
+    from_file: Optional[Path] = typer.Option(None, "--from-file", help=FROM_FILE_HELP),
+    chunk_size: int = typer.Option(500, "--chunk-size", min=1, help="Servers changed per bulk request"),
+    concurrency: int = typer.Option(4, "--concurrency", "-c", min=1, max=MAX_CONCURRENCY, help=CONCURRENCY_HELP),
     format: OutputFormat = typer.Option(OutputFormat.table, "--format", "-f", help="Output format")
 ):
-    """Update a server."""
+    """Update a server, or change the state of many at once.
+
+    Several IDs go through PATCH /servers/bulk in chunks, sent concurrently.
+    """
     payload = {}
     if hostname:
         payload["hostname"] = hostname
@@ -138,7 +367,19 @@ def update(
         typer.echo("No updates specified. Use --hostname, --ip, or --state.", err=True)
         raise typer.Exit(1)
 
-    response = requests.put(f"{API_URL}/{server_id}", json=payload)
+    server_ids = read_ids(server_ids, ids, from_file)
+    if len(server_ids) > 1:
+        if set(payload) != {"state"}:
+            typer.echo("Only --state can be changed on several servers at once.", err=True)
+            raise typer.Exit(1)
+        responses = fan_out(
+            lambda chunk: send("patch", f"{API_URL}/bulk", json={"ids": chunk, "state": state.value}),
+            chunks(server_ids, chunk_size), concurrency,
+        )
+        report_bulk("Updated", responses)
+        return
+
+    response = send("put", f"{API_URL}/{server_ids[0]}", json=payload)
     if response.status_code >= 400:
         typer.echo(f"Error: {response.text}", err=True)
         raise typer.Exit(1)
@@ -146,10 +387,25 @@ def update(
 
 
 @app.command()
-@retry_with_backoff()
-def delete(server_id: int):
-    """Delete a server."""
-    response = requests.delete(f"{API_URL}/{server_id}")
+def delete(
+    server_ids: Optional[List[int]] = typer.Argument(None, help="Server IDs"),
+    ids: Optional[str] = typer.Option(None, "--ids", help=IDS_HELP),
+    from_file: Optional[Path] = typer.Option(None, "--from-file", help=FROM_FILE_HELP),
+    chunk_size: int = typer.Option(500, "--chunk-size", min=1, help="Servers deleted per bulk request"),
+    concurrency: int = typer.Option(4, "--concurrency", "-c", min=1, max=MAX_CONCURRENCY, help=CONCURRENCY_HELP),
+):
+    """Delete servers; several IDs go through POST /servers/bulk-delete concurrently."""
+    server_ids = read_ids(server_ids, ids, from_file)
+    if len(server_ids) > 1:
+        responses = fan_out(
+            lambda chunk: send("post", f"{API_URL}/bulk-delete", json={"ids": chunk}),
+            chunks(server_ids, chunk_size), concurrency,
+        )
+        report_bulk("Deleted", responses)
+        return
+
+    server_id = server_ids[0]
+    response = send("delete", f"{API_URL}/{server_id}")
     if response.status_code == 404:
         typer.echo(f"Error: Server {server_id} not found", err=True)
         raise typer.Exit(1)
@@ -157,6 +413,176 @@ def delete(server_id: int):
     typer.echo(f"✓ Server {server_id} deleted successfully.")
 
 
+def detect_format(path: Path, fmt: Optional[FileFormat]) -> FileFormat:
+    """Use the explicit format, or guess it from the file extension."""
+    if fmt:
+        return fmt
+    return FileFormat.csv if path.suffix.lower() == ".csv" else FileFormat.ndjson
+
+
+def checkpoint_path(path: Path) -> Path:
+    return path.with_name(path.name + ".checkpoint")
+
+
+def load_checkpoint(path: Path) -> dict:
+    """Load a resume checkpoint, or an empty one if there is none."""
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path: Path, data: dict):
+    """Write a checkpoint atomically so an interrupted run never corrupts it."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+class BadRecord(NamedTuple):
+    """An NDJSON line that is not a JSON object, with its line number."""
+    line: int
+    detail: str
+
+
+def read_records(path: Path, fmt: FileFormat) -> Iterator[Union[dict, BadRecord]]:
+    """Stream server records from a CSV or NDJSON file one at a time.
+
+    Unparseable NDJSON lines come through as ``BadRecord`` so they count as
+    rows (keeping checkpoints aligned) and the import can go past them.
+    """
+    with open(path, newline="") as f:
+        if fmt == FileFormat.csv:
+            for row in csv.DictReader(f):
+                yield {k: row[k] for k in ("hostname", "ip_address", "state") if k in row}
+        else:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield BadRecord(number, f"invalid JSON: {e.msg}")
+                    continue
+                yield record if isinstance(record, dict) else BadRecord(number, "not a JSON object")
+
+
+def report_progress(action: str, done: int, started: float):
+    elapsed = max(time.monotonic() - started, 1e-9)
+    typer.echo(f"{action} {done} servers ({done / elapsed:.0f}/s)", err=True)
+
+
+@app.command("import")
+def import_servers(
+    file: Path = typer.Argument(..., exists=True, dir_okay=False, help="CSV or NDJSON file to import"),
+    file_format: Optional[FileFormat] = typer.Option(None, "--format", "-f", help="File format (default: from extension)"),
+    chunk_size: int = typer.Option(1000, "--chunk-size", min=1, help="Servers sent per bulk request"),
+    restart: bool = typer.Option(False, "--restart", help="Ignore any checkpoint and start from the top"),
+):
+    """Import servers from a file through the bulk endpoint.
+
+    The file is read and sent in chunks, so it never has to fit in memory.
+    Progress is saved to FILE.checkpoint after every chunk; rerunning the
+    command resumes from there.
+    """
+    fmt = detect_format(file, file_format)
+    checkpoint = checkpoint_path(file)
+    done = 0 if restart else load_checkpoint(checkpoint).get("rows", 0)
+    if done:
+        typer.echo(f"Resuming after {done} rows", err=True)
+
+    records = islice(read_records(file, fmt), done, None)
+    started, sent, failed = time.monotonic(), 0, 0
+    while chunk := list(islice(records, chunk_size)):
+        rows = []  # (row number, record) of the records worth sending
+        for index, record in enumerate(chunk):
+            if isinstance(record, BadRecord):
+                typer.echo(f"Line {record.line}: {record.detail}", err=True)
+                failed += 1
+            else:
+                rows.append((done + index + 1, record))
+        if rows:
+            body = "\n".join(json.dumps(record) for _, record in rows)
+            response = send(
+                "post", f"{API_URL}/bulk", data=body.encode(), headers={"Content-Type": "application/x-ndjson"}
+            )
+            if response.status_code >= 400:
+                typer.echo(f"Error: {response.text}", err=True)
+                raise typer.Exit(1)
+            for error in response.json()["errors"]:
+                typer.echo(f"Row {rows[error['index']][0]}: {error['detail']}", err=True)
+                failed += 1
+        done += len(chunk)
+        sent += len(chunk)
+        save_checkpoint(checkpoint, {"rows": done})
+        report_progress("Processed", sent, started)
+
+    checkpoint.unlink(missing_ok=True)
+    typer.echo(f"✓ Imported {sent - failed} servers ({failed} failed).")
+
+
+@app.command("export")
+def export_servers(
+    file: Path = typer.Argument(..., dir_okay=False, help="Destination CSV or NDJSON file"),
+    file_format: Optional[FileFormat] = typer.Option(None, "--format", "-f", help="File format (default: from extension)"),
+    page_size: int = typer.Option(1000, "--page-size", min=1, help="Servers fetched per request"),
+    state: Optional[str] = typer.Option(None, "--state", "-s", help="Filter by state"),
+    hostname: Optional[str] = typer.Option(None, "--hostname", "-h", help="Filter by hostname (contains)"),
+    restart: bool = typer.Option(False, "--restart", help="Ignore any checkpoint and start from the top"),
+):
+    """Export servers to a file, one page at a time.
+
+    Pages are appended to FILE as they arrive, so the fleet is never held
+    in memory. The cursor of the next page is saved to FILE.checkpoint;
+    rerunning the command resumes from there.
+    """
+    fmt = detect_format(file, file_format)
+    checkpoint = checkpoint_path(file)
+    state_data = {} if restart else load_checkpoint(checkpoint)
+    cursor, done = state_data.get("cursor"), state_data.get("rows", 0)
+    if cursor:
+        typer.echo(f"Resuming after {done} rows", err=True)
+
+    params = {"limit": page_size}
+    if state:
+        params["state"] = state
+    if hostname:
+        params["hostname_contains"] = hostname
+
+    if cursor:
+        # Drop anything written after the last checkpoint
+        os.truncate(file, state_data["offset"])
+
+    started, written = time.monotonic(), 0
+    with open(file, "a" if cursor else "w", newline="") as f:
+        writer = None
+        if fmt == FileFormat.csv:
+            writer = csv.DictWriter(f, fieldnames=SERVER_FIELDS, extrasaction="ignore")
+            if not cursor:
+                writer.writeheader()
+        while True:
+            page_params = dict(params, cursor=cursor) if cursor else params
+            response = send("get", API_URL, params=page_params)
+            response.raise_for_status()
+            page = response.json()
+            if writer:
+                writer.writerows(page)
+            else:
+                f.writelines(json.dumps(item) + "\n" for item in page)
+            f.flush()
+            done += len(page)
+            written += len(page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            offset = os.fstat(f.fileno()).st_size
+            save_checkpoint(checkpoint, {"cursor": cursor, "rows": done, "offset": offset})
+            report_progress("Exported", written, started)
+
+    checkpoint.unlink(missing_ok=True)
+    typer.echo(f"✓ Exported {done} servers to {file}.")
+
+
 if __name__ == "__main__":
     app()
 
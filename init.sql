@@ -11,5 +11,268 @@ CREATE TABLE IF NOT EXISTS servers (
     hostname VARCHAR(255) NOT NULL UNIQUE,
     ip_address INET,
     state server_state NOT NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    version INTEGER NOT NULL DEFAULT 1
 );
+
+-- Hostname search indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Trigram index serves hostname_contains (ILIKE '%foo%')
+CREATE INDEX IF NOT EXISTS ix_servers_hostname_trgm
+ON servers USING gin (hostname gin_trgm_ops);
+
+-- Pattern-ops btree serves hostname_prefix (LIKE 'foo%') in any collation
+CREATE INDEX IF NOT EXISTS ix_servers_hostname_prefix
+ON servers (hostname text_pattern_ops);
+
+-- GiST index serves subnet (<<=), ip_from/ip_to (>=, <=) and exact (=) address filters
+CREATE INDEX IF NOT EXISTS ix_servers_ip_address_gist
+ON servers USING gist (ip_address inet_ops);
+
+-- Bump the row version (used for ETags) on every UPDATE
+CREATE OR REPLACE FUNCTION servers_bump_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS servers_bump_version ON servers;
+CREATE TRIGGER servers_bump_version
+BEFORE UPDATE ON servers
+FOR EACH ROW EXECUTE FUNCTION servers_bump_version();
+
+-- NOTIFY servers_changed on every write. Row changes carry the id, the row
+-- after the write ("server", null for DELETE) and before it ("old", for UPDATE
+-- and DELETE) so watchers can filter without a query; TRUNCATE sends a null id
+CREATE OR REPLACE FUNCTION servers_notify_change() RETURNS trigger AS $$
+DECLARE
+    new_row json;
+    old_row json;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_row := json_build_object(
+            'id', NEW.id, 'hostname', NEW.hostname, 'ip_address', NEW.ip_address,
+            'state', NEW.state, 'created_at', NEW.created_at
+        );
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_row := json_build_object(
+            'id', OLD.id, 'hostname', OLD.hostname, 'ip_address', OLD.ip_address,
+            'state', OLD.state, 'created_at', OLD.created_at
+        );
+    END IF;
+    PERFORM pg_notify('servers_changed', json_build_object(
+        'op', TG_OP,
+        'id', CASE TG_OP WHEN 'DELETE' THEN OLD.id WHEN 'TRUNCATE' THEN NULL ELSE NEW.id END,
+        'server', new_row,
+        'old', old_row
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS servers_notify_change ON servers;
+CREATE TRIGGER servers_notify_change
+AFTER INSERT OR UPDATE OR DELETE ON servers
+FOR EACH ROW EXECUTE FUNCTION servers_notify_change();
+
+DROP TRIGGER IF EXISTS servers_notify_truncate ON servers;
+CREATE TRIGGER servers_notify_truncate
+AFTER TRUNCATE ON servers
+FOR EACH STATEMENT EXECUTE FUNCTION servers_notify_change();
+
+-- Fleet summary counters per state and /24 subnet, kept up to date by
+-- statement-level triggers (GET /servers/stats)
+CREATE OR REPLACE FUNCTION servers_subnet(ip inet) RETURNS cidr AS $$
+    SELECT network(set_masklen(ip, CASE family(ip) WHEN 4 THEN 24 ELSE 64 END))
+$$ LANGUAGE sql IMMUTABLE STRICT;
+
+CREATE TABLE IF NOT EXISTS server_state_counts (
+    state server_state PRIMARY KEY,
+    count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS server_subnet_counts (
+    state server_state NOT NULL,
+    subnet CIDR,
+    count BIGINT NOT NULL,
+    UNIQUE NULLS NOT DISTINCT (state, subnet)
+);
+
+-- Keeps the cleanup of emptied subnets cheap
+CREATE INDEX IF NOT EXISTS ix_server_subnet_counts_empty
+ON server_subnet_counts (state) WHERE count = 0;
+
+CREATE OR REPLACE FUNCTION servers_count_changes() RETURNS trigger AS $$
+DECLARE
+    changes text;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM server_subnet_counts;
+        UPDATE server_state_counts SET count = 0;
+        RETURN NULL;
+    END IF;
+
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT state, ip_address, 1 AS n FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT state, ip_address, -1 AS n FROM old_rows'
+        ELSE 'SELECT state, ip_address, 1 AS n FROM new_rows
+              UNION ALL SELECT state, ip_address, -1 FROM old_rows'
+    END;
+    EXECUTE format($sql$
+        WITH delta AS (
+            SELECT state, servers_subnet(ip_address) AS subnet, sum(n) AS n
+            FROM (%s) AS changes
+            GROUP BY 1, 2
+            HAVING sum(n) <> 0
+        ), by_state AS (
+            INSERT INTO server_state_counts AS c (state, count)
+            SELECT state, sum(n) FROM delta GROUP BY state
+            ON CONFLICT (state) DO UPDATE SET count = c.count + EXCLUDED.count
+        )
+        INSERT INTO server_subnet_counts AS c (state, subnet, count)
+        SELECT state, subnet, n FROM delta
+        ON CONFLICT (state, subnet) DO UPDATE SET count = c.count + EXCLUDED.count
+    $sql$, changes);
+    DELETE FROM server_subnet_counts WHERE count = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger
+DROP TRIGGER IF EXISTS servers_count_insert ON servers;
+CREATE TRIGGER servers_count_insert
+AFTER INSERT ON servers REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION servers_count_changes();
+
+DROP TRIGGER IF EXISTS servers_count_update ON servers;
+CREATE TRIGGER servers_count_update
+AFTER UPDATE ON servers REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION servers_count_changes();
+
+DROP TRIGGER IF EXISTS servers_count_delete ON servers;
+CREATE TRIGGER servers_count_delete
+AFTER DELETE ON servers REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION servers_count_changes();
+
+DROP TRIGGER IF EXISTS servers_count_truncate ON servers;
+CREATE TRIGGER servers_count_truncate
+AFTER TRUNCATE ON servers
+FOR EACH STATEMENT EXECUTE FUNCTION servers_count_changes();
+
+-- Backfill; every state gets a row, even when it has no servers yet
+INSERT INTO server_state_counts (state, count)
+SELECT s.state, count(servers.id)
+FROM unnest(enum_range(NULL::server_state)) AS s(state)
+LEFT JOIN servers ON servers.state = s.state
+GROUP BY s.state
+ON CONFLICT (state) DO UPDATE SET count = EXCLUDED.count;
+
+INSERT INTO server_subnet_counts (state, subnet, count)
+SELECT state, servers_subnet(ip_address), count(*)
+FROM servers
+GROUP BY 1, 2
+ON CONFLICT (state, subnet) DO UPDATE SET count = EXCLUDED.count;
+
+-- Change log for GET /servers/changes: one row per written server (NULL
+-- server_id for TRUNCATE). Readers page by (tx, seq) and only up to the
+-- oldest running transaction, so a row committed late can never land behind
+-- a watermark already handed out
+CREATE TABLE IF NOT EXISTS server_changes (
+    tx XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    seq BIGINT GENERATED ALWAYS AS IDENTITY,
+    server_id INTEGER,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (tx, seq)
+);
+
+CREATE INDEX IF NOT EXISTS ix_server_changes_server_id ON server_changes (server_id);
+
+-- Newest (tx, seq) removed by compaction; older watermarks get 410 Gone
+CREATE TABLE IF NOT EXISTS server_changes_horizon (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    tx XID8 NOT NULL,
+    seq BIGINT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION servers_log_changes() RETURNS trigger AS $$
+BEGIN
+    CASE TG_OP
+        WHEN 'INSERT', 'UPDATE' THEN
+            INSERT INTO server_changes (server_id) SELECT id FROM new_rows ORDER BY id;
+        WHEN 'DELETE' THEN
+            INSERT INTO server_changes (server_id) SELECT id FROM old_rows ORDER BY id;
+        ELSE
+            INSERT INTO server_changes (server_id) VALUES (NULL);
+    END CASE;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS servers_log_insert ON servers;
+CREATE TRIGGER servers_log_insert
+AFTER INSERT ON servers REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION servers_log_changes();
+
+DROP TRIGGER IF EXISTS servers_log_update ON servers;
+CREATE TRIGGER servers_log_update
+AFTER UPDATE ON servers REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION servers_log_changes();
+
+DROP TRIGGER IF EXISTS servers_log_delete ON servers;
+CREATE TRIGGER servers_log_delete
+AFTER DELETE ON servers REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION servers_log_changes();
+
+DROP TRIGGER IF EXISTS servers_log_truncate ON servers;
+CREATE TRIGGER servers_log_truncate
+AFTER TRUNCATE ON servers
+FOR EACH STATEMENT EXECUTE FUNCTION servers_log_changes();
+
+-- Collection version for the ETag and Last-Modified of GET /servers: one row,
+-- bumped by every statement that changes servers (not by ones matching no rows)
+CREATE TABLE IF NOT EXISTS server_collection_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 1,
+    modified_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO server_collection_version DEFAULT VALUES ON CONFLICT (id) DO NOTHING;
+
+-- modified_at never moves backwards, whatever the clocks say
+CREATE OR REPLACE FUNCTION servers_bump_collection_version() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM FROM old_rows LIMIT 1;
+    ELSIF TG_OP <> 'TRUNCATE' THEN
+        PERFORM FROM new_rows LIMIT 1;
+    END IF;
+    IF TG_OP = 'TRUNCATE' OR FOUND THEN
+        UPDATE server_collection_version
+        SET version = version + 1, modified_at = greatest(clock_timestamp(), modified_at);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS servers_collection_insert ON servers;
+CREATE TRIGGER servers_collection_insert
+AFTER INSERT ON servers REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION servers_bump_collection_version();
+
+DROP TRIGGER IF EXISTS servers_collection_update ON servers;
+CREATE TRIGGER servers_collection_update
+AFTER UPDATE ON servers REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION servers_bump_collection_version();
+
+DROP TRIGGER IF EXISTS servers_collection_delete ON servers;
+CREATE TRIGGER servers_collection_delete
+AFTER DELETE ON servers REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION servers_bump_collection_version();
+
+DROP TRIGGER IF EXISTS servers_collection_truncate ON servers;
+CREATE TRIGGER servers_collection_truncate
+AFTER TRUNCATE ON servers
+FOR EACH STATEMENT EXECUTE FUNCTION servers_bump_collection_version();
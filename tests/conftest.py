@@ -5,7 +5,11 @@ from httpx import AsyncClient, ASGITransport
 from app.main import app
 from app.database import get_db_connection, db
 from app.config import settings
+from app.cache import server_cache
 import psycopg
+from pathlib import Path
+
+INIT_SQL = Path(__file__).resolve().parent.parent / "init.sql"
 
 # Use a different DB for testing if possible, or just the same one for this simple task
 # In a real world, we'd spin up a test container or create a test_db
@@ -26,24 +30,12 @@ async def db_pool():
         async with conn.cursor() as cur:
              # Very simple teardown/rebuild for fresh state
              await cur.execute("DROP TABLE IF EXISTS servers CASCADE")
+             await cur.execute("DROP TABLE IF EXISTS server_state_counts, server_subnet_counts CASCADE")
+             await cur.execute("DROP TABLE IF EXISTS server_changes, server_changes_horizon, server_collection_version CASCADE")
              await cur.execute("DROP TYPE IF EXISTS server_state CASCADE")
              
-             # Re-create (Read init.sql would be better, but hardcoding for simplicity of this artifact)
-             await cur.execute("""
-                DO $$ BEGIN
-                    CREATE TYPE server_state AS ENUM ('active', 'offline', 'retired');
-                EXCEPTION
-                    WHEN duplicate_object THEN null;
-                END $$;
-                
-                CREATE TABLE IF NOT EXISTS servers (
-                    id SERIAL PRIMARY KEY,
-                    hostname VARCHAR(255) NOT NULL UNIQUE,
-                    ip_address INET,
-                    state server_state NOT NULL,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                );
-             """)
+             # Re-create from init.sql so tests run against the same schema as the stack
+             await cur.execute(INIT_SQL.read_text())
     yield
 
 @pytest_asyncio.fixture
@@ -56,6 +48,8 @@ async def override_get_db(db_pool):
         async with conn.cursor() as cur:
             await cur.execute("TRUNCATE TABLE servers RESTART IDENTITY")
             await conn.commit()
+    # Ids restart from 1, so cached rows from earlier tests must go too
+    server_cache.clear()
     
     # Return the actual dependency
     async for conn in get_db_connection():
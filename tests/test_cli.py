@@ -1,3 +1,7 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
 from typer.testing import CliRunner
 from cli.main import app
 from unittest.mock import patch, MagicMock
@@ -9,7 +13,7 @@ def test_list_servers():
     mock_response.status_code = 200
     mock_response.json.return_value = [{"id": 1, "hostname": "test"}]
     
-    with patch("requests.get", return_value=mock_response) as mock_get:
+    with patch("requests.Session.get", return_value=mock_response) as mock_get:
         result = runner.invoke(app, ["list"])
         assert result.exit_code == 0
         assert "test" in result.stdout
@@ -20,8 +24,215 @@ def test_create_server():
     mock_response.status_code = 201
     mock_response.json.return_value = {"id": 1, "hostname": "new", "state": "active"}
 
-    with patch("requests.post", return_value=mock_response) as mock_post:
+    with patch("requests.Session.post", return_value=mock_response) as mock_post:
         result = runner.invoke(app, ["create", "new", "1.1.1.1", "active"])
         assert result.exit_code == 0
         assert "new" in result.stdout
         mock_post.assert_called_once()
+
+def test_import_servers_in_chunks(tmp_path):
+    source = tmp_path / "servers.csv"
+    source.write_text(
+        "hostname,ip_address,state\n"
+        "a,10.0.0.1,active\n"
+        "b,10.0.0.2,active\n"
+        "c,10.0.0.3,offline\n"
+    )
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"created": [], "errors": []}
+
+    with patch("requests.Session.post", return_value=mock_response) as mock_post:
+        result = runner.invoke(app, ["import", str(source), "--chunk-size", "2"])
+        assert result.exit_code == 0
+        assert mock_post.call_count == 2
+        first_chunk = mock_post.call_args_list[0].kwargs["data"].decode().splitlines()
+        assert [json.loads(line)["hostname"] for line in first_chunk] == ["a", "b"]
+    assert not (tmp_path / "servers.csv.checkpoint").exists()
+
+def test_import_resumes_from_checkpoint(tmp_path):
+    source = tmp_path / "servers.ndjson"
+    source.write_text("\n".join(
+        json.dumps({"hostname": h, "ip_address": "10.0.0.1", "state": "active"}) for h in "abc"
+    ))
+    (tmp_path / "servers.ndjson.checkpoint").write_text(json.dumps({"rows": 2}))
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"created": [{"index": 0, "id": 3}], "errors": []}
+
+    with patch("requests.Session.post", return_value=mock_response) as mock_post:
+        result = runner.invoke(app, ["import", str(source)])
+        assert result.exit_code == 0
+        body = mock_post.call_args.kwargs["data"].decode()
+        assert json.loads(body)["hostname"] == "c"
+
+def test_import_reports_malformed_lines_and_continues(tmp_path):
+    source = tmp_path / "servers.ndjson"
+    source.write_text(
+        json.dumps({"hostname": "a", "ip_address": "10.0.0.1", "state": "active"}) + "\n"
+        '{"hostname": "b", \n'
+        "\n"
+        "[1, 2]\n"
+        + json.dumps({"hostname": "c", "ip_address": "10.0.0.3", "state": "active"}) + "\n"
+    )
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"created": [], "errors": [{"index": 1, "detail": "bad ip"}]}
+
+    with patch("requests.Session.post", return_value=mock_response) as mock_post:
+        result = runner.invoke(app, ["import", str(source)])
+    assert result.exit_code == 0
+    sent = mock_post.call_args.kwargs["data"].decode().splitlines()
+    assert [json.loads(line)["hostname"] for line in sent] == ["a", "c"]
+    assert "Line 2: invalid JSON" in result.stderr
+    assert "Line 4: not a JSON object" in result.stderr
+    # Server errors still name the row in the file, not in the request
+    assert "Row 4: bad ip" in result.stderr
+    assert "Imported 1 servers (3 failed)" in result.stdout
+    assert not (tmp_path / "servers.ndjson.checkpoint").exists()
+
+def test_export_servers_follows_cursor(tmp_path):
+    first = MagicMock(status_code=200, headers={"X-Next-Cursor": "abc"})
+    first.json.return_value = [{"id": 1, "hostname": "a", "ip_address": "10.0.0.1", "state": "active"}]
+    second = MagicMock(status_code=200, headers={})
+    second.json.return_value = [{"id": 2, "hostname": "b", "ip_address": "10.0.0.2", "state": "active"}]
+    target = tmp_path / "out.ndjson"
+
+    with patch("requests.Session.get", side_effect=[first, second]) as mock_get:
+        result = runner.invoke(app, ["export", str(target), "--page-size", "1"])
+        assert result.exit_code == 0
+        assert mock_get.call_args_list[1].kwargs["params"]["cursor"] == "abc"
+    assert [json.loads(line)["hostname"] for line in target.read_text().splitlines()] == ["a", "b"]
+    assert not (tmp_path / "out.ndjson.checkpoint").exists()
+
+# Startup: the CLI is run thousands of times by automation
+HELP_IMPORT_BUDGET_MS = 80
+
+def _imports(*args):
+    """(module, cumulative import time in us, nested?) for a fresh interpreter."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = [line.split("|") for line in stderr.splitlines() if line.startswith("import time:")]
+    return [
+        (name.strip(), int(cumulative), name.startswith("  "))
+        for _, cumulative, name in rows
+        if cumulative.strip().isdigit()
+    ]
+
+def test_help_skips_heavy_imports():
+    imported = _imports("-m", "cli.main", "--help")
+    assert not {"requests", "rich"} & {name.split(".")[0] for name, _, _ in imported}
+
+def test_help_import_time_budget():
+    startup = {name for name, _, _ in _imports("-c", "pass")}
+    costs = []
+    for _ in range(3):  # best of three, to ride out a noisy machine
+        imported = _imports("-m", "cli.main", "--help")
+        costs.append(sum(us for name, us, nested in imported if not nested and name not in startup) / 1000)
+    assert min(costs) < HELP_IMPORT_BUDGET_MS
+
+# Session, retries and batch commands
+def _response(status_code, body=None, headers=None):
+    response = MagicMock(status_code=status_code, headers=headers or {}, text=json.dumps(body))
+    response.json.return_value = body
+    return response
+
+def test_get_fetches_several_ids_concurrently():
+    def fake_get(url, **kwargs):
+        server_id = int(url.rsplit("/", 1)[1])
+        if server_id == 3:
+            return _response(404, {"detail": "Server not found"})
+        return _response(200, {"id": server_id, "hostname": f"web-{server_id}"})
+
+    with patch("requests.Session.get", side_effect=fake_get) as mock_get:
+        result = runner.invoke(app, ["get", "1", "2", "--ids", "3,2", "--format", "json"])
+    assert mock_get.call_count == 3  # duplicates are fetched once
+    assert result.exit_code == 1
+    assert "Server 3 not found" in result.output
+    assert '"web-1"' in result.output and '"web-2"' in result.output
+
+def test_delete_from_file_uses_bulk_endpoint_in_chunks(tmp_path):
+    ids_file = tmp_path / "ids.txt"
+    ids_file.write_text("1\n2\n3\n\n")
+
+    def fake_post(url, json=None, **kwargs):
+        return _response(200, {"affected": json["ids"], "not_found": [], "precondition_failed": []})
+
+    with patch("requests.Session.post", side_effect=fake_post) as mock_post:
+        result = runner.invoke(app, ["delete", "--from-file", str(ids_file), "--chunk-size", "2"])
+    assert result.exit_code == 0
+    assert "Deleted 3 servers" in result.stdout
+    assert all(call.args[0].endswith("/bulk-delete") for call in mock_post.call_args_list)
+    assert sorted(call.kwargs["json"]["ids"] for call in mock_post.call_args_list) == [[1, 2], [3]]
+
+def test_update_state_of_many_servers():
+    body = {"affected": [1], "not_found": [2], "precondition_failed": []}
+    with patch("requests.Session.patch", return_value=_response(200, body)) as mock_patch:
+        result = runner.invoke(app, ["update", "--ids", "1,2", "--state", "retired"])
+    assert mock_patch.call_args.kwargs["json"] == {"ids": [1, 2], "state": "retired"}
+    assert result.exit_code == 1
+    assert "Server 2 not found" in result.output
+
+    result = runner.invoke(app, ["update", "--ids", "1,2", "--hostname", "same"])
+    assert result.exit_code == 1
+
+def test_retry_honours_retry_after():
+    busy = _response(503, headers={"Retry-After": "2"})
+    ok = _response(200, [])
+    with patch("requests.Session.get", side_effect=[busy, ok]), patch("cli.main.time.sleep") as sleep:
+        result = runner.invoke(app, ["list"])
+    assert result.exit_code == 0
+    sleep.assert_called_once_with(2.0)
+
+def test_retry_connection_errors_with_jitter():
+    import requests
+    ok = _response(200, [])
+    error = requests.exceptions.ConnectionError("refused")
+    with patch("requests.Session.get", side_effect=[error, error, ok]), patch("cli.main.time.sleep") as sleep:
+        result = runner.invoke(app, ["list"])
+    assert result.exit_code == 0
+    delays = [call.args[0] for call in sleep.call_args_list]
+    assert len(delays) == 2 and 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+
+    with patch("requests.Session.get", side_effect=error), patch("cli.main.time.sleep"):
+        result = runner.invoke(app, ["list"])
+    assert result.exit_code == 1
+    assert "Failed after 3 attempts" in result.output
+
+# list --all
+PAGES = [
+    [{"id": 1, "hostname": "a", "state": "active"}, {"id": 2, "hostname": "b", "state": "active"}],
+    [{"id": 3, "hostname": "c", "state": "offline"}],
+]
+
+def _paged_get(url, params=None, **kwargs):
+    if params.get("cursor") == "p2":
+        return _response(200, PAGES[1])
+    return _response(200, PAGES[0], headers={"X-Next-Cursor": "p2"})
+
+def test_list_all_walks_pages_as_ndjson():
+    with patch("requests.Session.get", side_effect=_paged_get) as mock_get:
+        result = runner.invoke(app, ["list", "--all", "--page-size", "2", "--format", "ndjson", "--state", "active"])
+    assert result.exit_code == 0
+    assert [json.loads(line)["id"] for line in result.stdout.splitlines()] == [1, 2, 3]
+    assert [call.kwargs["params"] for call in mock_get.call_args_list] == [
+        {"state": "active", "limit": 2},
+        {"state": "active", "limit": 2, "cursor": "p2"},
+    ]
+
+def test_list_all_streams_same_output_as_one_page():
+    with patch("requests.Session.get", side_effect=_paged_get):
+        streamed = runner.invoke(app, ["list", "--all", "--format", "json"]).stdout
+        table = runner.invoke(app, ["list", "--all"]).stdout
+    assert streamed == json.dumps(PAGES[0] + PAGES[1], indent=2) + "\n"
+    assert table.splitlines()[0] == "id | hostname | state"
+    assert len(table.splitlines()) == 5
+
+def test_list_warns_when_more_pages_exist():
+    with patch("requests.Session.get", side_effect=_paged_get) as mock_get:
+        result = runner.invoke(app, ["list", "--format", "json"])
+    assert mock_get.call_count == 1
+    assert json.loads(result.stdout) == PAGES[0]
+    assert "use --all" in result.output